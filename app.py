@@ -1,19 +1,31 @@
 # --- Imports ---
-from flask import Flask, render_template, request, redirect, session, url_for, flash
-from flask_migrate import Migrate
+from flask import Flask, render_template, request, redirect, session, url_for, flash, jsonify
 from flask_mail import Mail, Message
 from flask_apscheduler import APScheduler
-from authlib.integrations.flask_client import OAuth
-from authlib.integrations.base_client import OAuthError
 from flask_cors import CORS
+from sqlalchemy import and_, or_, func, case
+from sqlalchemy.orm import joinedload, selectinload
+import click
 import requests
-from pint import UnitRegistry
-import pycountry
 import random
 import os
+from contextlib import ExitStack
+from datetime import datetime, timedelta
 
 from config import *
 from tools.routes import json_bp
+from dashboard import load_dashboard
+from users import get_current_user, current_feature_keys, login_user, logout_user
+from trivia_pool import question_pool
+from cat_facts import cat_fact_corpus, InvalidFact
+from seed import run_seed, SEED_VERSION
+from job_lease import leased_job, renew_lease
+from points import spend_points, has_points, award_points, points_earned_this_week, add_trivia_freezer, use_trivia_freezer
+from entitlements import has_feature, entitled, grant_feature, key_bit
+from http_client import upstream
+from leaderboard import leaderboard, PAGE_SIZE as LEADERBOARD_PAGE_SIZE
+from units import convert_units, ConversionError, UnknownUnitError
+from currency import rate_table, RatesUnavailable, UnknownCurrency
 from models import *
 from config import SQLALCHEMY_DATABASE_URI as default_db_uri
 
@@ -27,26 +39,31 @@ CORS(app)
 app.register_blueprint(json_bp)
 
 # --- Extensions Initialization ---
-ureg = UnitRegistry()
-
-# OAuth setup
-oauth = OAuth(app)
-google = oauth.register(
-    name="google",
-    client_id=google_client_id,
-    client_secret=google_client_secret,
-    server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-    client_kwargs={"scope": "openid profile email"},
-)
+# OAuth setup, Authlib is only imported once someone logs in with Google
+_google = None
+
+def google_client():
+    global _google
+    if _google is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(app)
+        _google = oauth.register(
+            name="google",
+            client_id=google_client_id,
+            client_secret=google_client_secret,
+            server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+            client_kwargs={"scope": "openid profile email"},
+        )
+    return _google
 
 
-# Mail setup
-mail = Mail(app)
+# Mail setup (config has to be in place before Mail reads it)
 app.config["MAIL_SERVER"] = MAIL_SERVER
 app.config["MAIL_PORT"] = MAIL_PORT
 app.config["MAIL_USERNAME"] = MAIL_USERNAME
 app.config["MAIL_PASSWORD"] = MAIL_PASSWORD
 app.config["MAIL_USE_SSL"] = MAIL_USE_SSL
+mail = Mail(app)
 
 # Database setup
 db_url = os.getenv("DATABASE_URL", default_db_uri)
@@ -55,13 +72,19 @@ if db_url and db_url.startswith("postgres://"):
 app.config["SQLALCHEMY_DATABASE_URI"] = db_url
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = SQLALCHEMY_TRACK_MODIFICATIONS
 db.init_app(app)
-migrate = Migrate(app, db)
+# Flask-Migrate pulls in all of alembic, only the `flask db ...` commands need it
+if os.getenv("FLASK_RUN_FROM_CLI"):
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db, render_as_batch=True)  # batch mode so column changes also work on SQLite
+question_pool.init_app(app)
+cat_fact_corpus.init_app(app)
 
 # APScheduler configuration
 class Config:
     SCHEDULER_API_ENABLED = True
 
 app.config.from_object(Config())
+# Every process runs the scheduler, the jobs themselves are @leased_job so only one process actually does the work
 scheduler = APScheduler()
 scheduler.init_app(app)
 scheduler.start()
@@ -69,9 +92,10 @@ scheduler.start()
 
 # --- Helper Functions ---
 
-def check():
-    current_user = User.query.filter_by(username=session['username']).first()
-    return current_user.points > 0
+# Templates check features with `"key" in purchased_keys`, the keys come from the already loaded user
+@app.context_processor
+def inject_feature_keys():
+    return {'purchased_keys': current_feature_keys()}
 
 
 
@@ -92,12 +116,19 @@ Converter_Questions = {
 
 
 # --- API Integration: Unit Conversion ---
+# Conversions run locally on Pint (units.py), API Ninjas is only asked about units Pint doesn't know
+USE_API_NINJAS_FALLBACK = True
+
 def convert_units_api_ninjas(amount, from_unit, to_unit):
     from_unit = from_unit.strip().lower().replace(" ", "_")
     to_unit = to_unit.strip().lower().replace(" ", "_")
     url = f"https://api.api-ninjas.com/v1/unitconversion?amount={amount}&unit={from_unit}"
     headers = {"X-Api-Key": API_NINJAS}
-    response = requests.get(url, headers=headers)
+    try:
+        response = upstream.get(url, headers=headers)
+    except requests.exceptions.RequestException as e:
+        print(f"API Ninjas request failed: {e}")
+        return None
     if response.status_code == 200:
         data = response.json()
         conversions = data.get("conversions", {})
@@ -127,7 +158,7 @@ def login():
     user = User.query.filter_by(username=username).first()
     #This line queries the db to find the user and filters by finding the username and .first() retrieves the first finding result
     if user and user.check_password(password): #if there is user and the password matches it returns True
-        session['username'] = username
+        login_user(user)
         flash("You've been successfully logged in")
         # stores the username inside session if it is authenticated
         return redirect(url_for('main'))
@@ -153,7 +184,7 @@ def register():
             new_user.email = email
         db.session.add(new_user) #This adds the user inside the db
         db.session.commit() #this commits the information
-        session['username'] = username #Create a new session for this user, like using a dictionary
+        login_user(new_user) #Create a new session for this user, like using a dictionary
         return redirect(url_for('main'))# Returns the user to the main page
 
 #Login for google
@@ -161,13 +192,15 @@ def register():
 def login_google():
     try:
         redirect_uri = url_for('authorize_google', _external=True)
-        return google.authorize_redirect(redirect_uri)
+        return google_client().authorize_redirect(redirect_uri)
     except Exception as e:
         app.logger.error(f"Error during login:{str(e)}")
         return "Error occurred during login", 500
 
 @app.route("/authorize/google")
 def authorize_google():
+    from authlib.integrations.base_client import OAuthError
+    google = google_client()
     try:
         token = google.authorize_access_token()
     except OAuthError as e:
@@ -175,7 +208,8 @@ def authorize_google():
         flash("Google login was cancelled or failed.")
         return redirect(url_for('home'))
 
-    userinfo_endpoint = google.server_metadata['userinfo_endpoint']
+    # Fetched from Google the first time it's needed, then kept on the client
+    userinfo_endpoint = google.load_server_metadata()['userinfo_endpoint']
     resp = google.get(userinfo_endpoint)
     user_info = resp.json()
     email = user_info['email']
@@ -192,7 +226,7 @@ def authorize_google():
         db.session.add(user)
         db.session.commit()
 
-    session['username'] = user.username
+    login_user(user)
     session['oauth_token'] = token
 
     return redirect(url_for('main'))
@@ -202,37 +236,11 @@ def authorize_google():
 @app.route('/main')
 def main():
     if "username" in session:
-        current_user = User.query.filter_by(username=session['username']).first()
-        city, country_code, country_name, articles = "Unknown", "", "Unknown", []
-        try:
-            ip_response = requests.get(IP_API_URL)
-            ip_data = ip_response.json()
-            user_ip = ip_data.get("ip", "")
-            print(f"User IP: {user_ip}")  # Debug log
-
-            geo_response = requests.get(f"{GEO_API_URL}{user_ip}")
-            geo_data = geo_response.json()
-            print(f"Geolocation Data: {geo_data}")  # Debug log
-
-            country_code = geo_data.get("countryCode", "")
-
-            if country_code:
-                country_obj = pycountry.countries.get(alpha_2=country_code)
-                country_name = country_obj.name if country_obj else "Unknown"
-
-                #Fetch local news based on country
-                news_response = requests.get(NEWS_API_URL, params={
-                    "country": country_code.lower(),
-                    "token": NEWS_API_KEY,
-                    "max": 3
-                })
-                news_data = news_response.json()
-                print(f"News API Response: {news_data}")
-                articles = news_data.get("articles", [])[:3]
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error here with: {e}")
-        return render_template("main structures/main.html", username=session['username'], user=current_user, country=country_name, articles=articles)
+        current_user = get_current_user()
+        # Upstream lookups run concurrently under one deadline and are cached, see dashboard.py
+        dashboard = load_dashboard()
+        earned_this_week = points_earned_this_week(current_user.id)
+        return render_template("main structures/main.html", username=session['username'], user=current_user, earned_this_week=earned_this_week, country=dashboard["country"], articles=dashboard["articles"])
     return redirect(url_for('home'))
 
 @app.route('/update-email', methods=["POST"])
@@ -240,7 +248,7 @@ def update_email():
     if "username" not in session:
         return redirect(url_for('home'))
     
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     email = request.form.get('email', '').strip()
     
     if not email:
@@ -254,6 +262,7 @@ def update_email():
         return redirect(url_for('main'))
     
     current_user.email = email
+    reschedule_reminders(current_user)
     db.session.commit()
     flash("Email updated successfully!")
     return redirect(url_for('main'))
@@ -261,47 +270,70 @@ def update_email():
 @app.route('/logout', methods=["POST"])
 def logout():
     #Just use the python function pop the user to get rid of the user from the session
-    session.pop('username', None)
+    logout_user()
     flash("You have been logged out")
     return redirect(url_for('home'))
 
 
 
 #Task Manager
+TASK_SEARCH_PAGE_SIZE = 25
+
+def open_tasks(user):
+    # Tags come in one extra query for the whole list instead of one per task
+    return (Task.query.options(selectinload(Task.tags))
+            .filter_by(user_id=user.id, completed=False)
+            .order_by(Task.date_created, Task.id)
+            .all())
+
+def search_tasks_by_tags(user, tag_ids, match='all', page=1, per_page=TASK_SEARCH_PAGE_SIZE):
+    # Task ids that have ALL (or ANY) of the tags, worked out in SQL by grouping task_tags
+    matching_ids = (db.session.query(task_tags.c.task_id)
+                    .filter(task_tags.c.tag_id.in_(tag_ids))
+                    .group_by(task_tags.c.task_id))
+    if match == 'all':
+        matching_ids = matching_ids.having(func.count(task_tags.c.tag_id) == len(tag_ids))
+
+    return (Task.query.options(selectinload(Task.tags))
+            .filter(Task.user_id == user.id, Task.completed == False, Task.id.in_(matching_ids))
+            .order_by(Task.date_created, Task.id)
+            .paginate(page=page, per_page=per_page, error_out=False))
+
 @app.route('/task-manager', methods=["POST", "GET"])
 def task_manager():
     # Handle POST requests (when the user submits a new task).
     if 'username' not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     tags = Tag.query.filter_by(user_id=current_user.id).all()
     filtered_tasks = None
     searched_tasks = None
 
-    if request.method == 'POST':
+    # Tag search works from the form (POST) and from the page links of the results (GET)
+    search_source = request.form if 'search_tags' in request.form else request.args
+    if 'search_tags' in search_source:
+        # Handle search by tags
+        own_tag_ids = {tag.id for tag in tags}
+        selected_tag_ids = sorted({int(tag_id) for tag_id in search_source.getlist('search_tags') #getlist because search tags can have multiple values
+                                   if tag_id.isdigit() and int(tag_id) in own_tag_ids})
+        match = 'any' if search_source.get('match') == 'any' else 'all'
+        filtered_page = None
+        if selected_tag_ids:
+            filtered_page = search_tasks_by_tags(current_user, selected_tag_ids, match, page=search_source.get('page', 1, type=int))
+            filtered_tasks = filtered_page.items
+        else:
+            filtered_tasks = []
+        tasks = open_tasks(current_user)
+        return render_template("task manager/task_manager.html", user=current_user, tasks=tasks, tags=tags, datetime=datetime, filtered_tasks=filtered_tasks, searched_tasks=searched_tasks,
+                               filtered_page=filtered_page, selected_tag_ids=selected_tag_ids, match=match)
 
-        if 'search_tags' in request.form:
-            # Handle search by tags
-            selected_tag_ids = request.form.getlist('search_tags') #getlist because search tags can have multiple values
-            if selected_tag_ids:
-                tasks = Task.query.filter_by(user=current_user, completed=False).all()
-                filtered_tasks = [
-                    task for task in tasks
-                    if all(
-                        any(tag.id == int(tag_id) for tag in task.tags)  # Check if the tag exists in the task's tags
-                        for tag_id in selected_tag_ids  # Iterate over all selected tag IDs
-                    )
-                ]
-            else:
-                filtered_tasks = []
-            tasks = Task.query.filter_by(user=current_user, completed=False).order_by(Task.date_created).all()
-            return render_template("task manager/task_manager.html", user=current_user, tasks=tasks, tags=tags, datetime=datetime, filtered_tasks=filtered_tasks, searched_tasks=searched_tasks)
+    if request.method == 'POST':
 
-        elif 'task_name' in request.form:
+        if 'task_name' in request.form:
             search_query = request.form.get('task_name', '').strip()
             if search_query:
-                searched_tasks = Task.query.filter(
+                searched_tasks = Task.query.options(selectinload(Task.tags)).filter(
                     Task.user == current_user,
                     Task.task.ilike(f'%{search_query}%') # case insensitive search inside task column in Task class for search_query
                 ).all()
@@ -322,7 +354,8 @@ def task_manager():
                     print("Invalid something going on here")
 
             # Create a new Task object with the submitted task content.
-            new_task = Task(task=task_content, due_date=due_date, user=current_user)
+            new_task = Task(task=task_content, due_date=due_date, user=current_user, completed=False)
+            new_task.schedule_next_reminder(reminders_enabled(current_user))
             db.session.add(new_task)
             # Commit the changes to save the task in the database.
             db.session.commit()
@@ -332,14 +365,13 @@ def task_manager():
         elif 'task_reminder' in request.form:
             pass
         # If no valid form data is provided, return the task manager page.
-        tasks = Task.query.filter_by(user=current_user, completed=False).order_by(Task.date_created).all()
+        tasks = open_tasks(current_user)
         return render_template("task manager/task_manager.html", user=current_user, tasks=tasks, tags=tags, datetime=datetime)
 
     else:
         # Handle GET requests (when the user visits the task manager page).
         # Query all tasks from the database, ordered by the date they were created.
-        tasks = Task.query.filter_by(user=current_user, completed=False).order_by(Task.date_created).all() #Grabs by oldest to newest
-        tags = Tag.query.filter_by(user_id=current_user.id).all()
+        tasks = open_tasks(current_user) #Grabs by oldest to newest
         # Render the task manager HTML template and pass the list of tasks to it.
         return render_template("task manager/task_manager.html", user=current_user, tasks=tasks, tags=tags, datetime=datetime)
 
@@ -347,7 +379,7 @@ def task_manager():
 def delete(id):
     # Attempt to retrieve the task from the database by its ID.
     # If the task does not exist, return a 404 error.
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     task_to_delete = Task.query.get_or_404(id)
     if task_to_delete.user != current_user:
         return "Unauthorized", 403
@@ -369,7 +401,7 @@ def update(id):
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     task = Task.query.get_or_404(id)
 
     if task.user != current_user:
@@ -378,6 +410,7 @@ def update(id):
     if request.method == 'POST':
         # Update the task's content with the new value submitted in the form.
         task.task = request.form['task']
+        task.schedule_next_reminder(reminders_enabled(current_user))
         try:
             db.session.commit()
             return redirect('/task-manager')
@@ -391,7 +424,7 @@ def complete(id):
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     task = Task.query.get_or_404(id)
 
     if task.user != current_user:
@@ -400,6 +433,7 @@ def complete(id):
     try:
         task.completed = True
         task.date_completed = datetime.now()
+        task.next_reminder_at = None
         #This marks the task as completed and sets the date completed to now
 
         elapsed_time = task.date_completed - task.date_created
@@ -412,7 +446,7 @@ def complete(id):
         else:
             points_earned = 0
 
-        current_user.points += points_earned
+        award_points(current_user, points_earned, 'task_completed')
 
         db.session.commit()
         return redirect('/task-manager')
@@ -425,7 +459,7 @@ def archived_tasks():
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     tasks = Task.query.filter_by(user=current_user, completed=True).order_by(Task.date_completed).all()
 
     return render_template('task manager/archive.html', tasks=tasks)
@@ -435,22 +469,16 @@ def create_tag():
     if 'username' not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
-    add_tag_feature = Feature.query.filter_by(key="add_tags").first()
+    current_user = get_current_user()
 
     # Checks if the add tag feature is in the purchased feature or not, if not it flashes
-    if add_tag_feature not in current_user.purchased_features:
+    if not has_feature(current_user, "add_tags"):
         flash("Purhcase the feature first you poor ahh dumb bum", "feature-add_tag")
         return redirect(url_for('shop'))
 
     if request.method == 'POST':
         tag_name = request.form.get('tag_name').strip()
 
-        #If the user has enough points or not
-        if current_user.points < 1:
-            flash("Not enough points u poor ahh soul", "feature-add_tag")
-            return redirect(url_for('task_manager'))
-
         #This code checks if the new tag has already been added inside the Tag database
         exist_or_not = Tag.query.filter_by(name=tag_name, user_id=current_user.id).first()
 
@@ -458,7 +486,10 @@ def create_tag():
             flash("You already have this tag, I don't even know what to say, ur just dumb", "feature-add_tag")
             return redirect(url_for('task_manager'))
 
-        current_user.points -= 1
+        #Takes the point only if the user still has one
+        if not spend_points(current_user, 1, 'create_tag'):
+            flash("Not enough points u poor ahh soul", "feature-add_tag")
+            return redirect(url_for('task_manager'))
         new_tag = Tag(name=tag_name, user_id = current_user.id)
 
         db.session.add(new_tag)
@@ -473,7 +504,7 @@ def create_tag():
 def delete_tag():
     if 'username' not in session:
         return redirect(url_for('home'))
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     tag_id = int(request.form['tag_id'])
     tag = Tag.query.get_or_404(tag_id)
     if tag.user_id != current_user.id:
@@ -488,7 +519,7 @@ def delete_tag():
 def add_tag_to_task(task_id):
     if 'username' not in session:
         return redirect(url_for('home'))
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     task = Task.query.get_or_404(task_id)
     if task.user != current_user:
         return "Unauthorized", 403
@@ -504,7 +535,7 @@ def add_tag_to_task(task_id):
 def remove_tag_from_task(task_id, tag_id):
     if 'username' not in session:
         return redirect(url_for('home'))
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     task = Task.query.get_or_404(task_id)
     if task.user != current_user:
         return "Unauthorized", 403
@@ -516,58 +547,90 @@ def remove_tag_from_task(task_id, tag_id):
     return redirect(url_for('update', id=task_id))
 
 #Scheduler for reminders
-@scheduler.task('interval', id='send_reminders', hours=24)#Sets the interval to 24 hours to run the function
+REMINDER_CHUNK_SIZE = 500
+REMINDER_POLL_MINUTES = 5
+REMINDER_RETRY_DELAY = timedelta(minutes=15)
+REMINDER_LEASE = timedelta(minutes=REMINDER_POLL_MINUTES * 1.5)
+
+def reminders_enabled(user):
+    return bool(user.email) and has_feature(user, "task_reminder")
+
+def reschedule_reminders(user):
+    # Called when something that decides whether a user gets reminders changes (email, features)
+    enabled = reminders_enabled(user)
+    for task in Task.query.filter(Task.user_id == user.id, Task.completed == False, Task.due_date.isnot(None)):
+        task.schedule_next_reminder(enabled)
+
+@scheduler.task('interval', id='send_reminders', minutes=REMINDER_POLL_MINUTES)
+@leased_job(app, 'send_reminders', REMINDER_LEASE)
 def send_reminders():
     #Makes sure flask has access to the db to use it
     with app.app_context(): #Makes sure the app context is available for db access
         now = datetime.now()
-        all_tasks = Task.query.filter_by(completed=False).all()
-        
-        # Get the task reminders feature once
-        task_reminders = Feature.query.filter_by(key="task_reminders").first()
-        
-        for task in all_tasks:
-            # Check if this task's user has the reminder feature
-            if task_reminders not in task.user.purchased_features:
-                continue
-                
-            if not task.due_date or not task.user.email:
-                #Skips tasks with no due date or no email
-                continue
-
-            days_until_due = (task.due_date - now).days
-            hours_until_due = (task.due_date - now).total_seconds() // 3600
-
-            #User that owns the task
-            user = task.user
-            #Email of the user
-            recipient = user.email
-
-            #If the task is due in 7 days and you haven't sent this reminder yet
-            if days_until_due == 7 and not task.reminder_sent_7:
-                try:
-                    send_reminder_email(user.username, recipient, task.task, task.due_date, 7)
-                    task.reminder_sent_7 = True
-                except Exception as e:
-                    print(f"Failed to send 7-day reminder for task {task.id}: {e}")
 
-            elif days_until_due == 3 and not task.reminder_sent_3:
-                try:
-                    send_reminder_email(user.username, recipient, task.task, task.due_date, 3)
-                    task.reminder_sent_3 = True
-                except Exception as e:
-                    print(f"Failed to send 3-day reminder for task {task.id}: {e}")
+        # One SMTP connection for the whole run instead of one per email. It's only opened when the first
+        # email actually goes out, so polls with nothing to send and the bookkeeping below don't need the mail server
+        with ExitStack() as stack:
+            connection = None
+            connect_error = None
+            while True:
+                # Still ours? Raises LeaseLost and ends the run if another process took over while we were sending
+                renew_lease('send_reminders', REMINDER_LEASE)
+                # Only tasks with a reminder due right now, straight off the next_reminder_at index.
+                # Every task handled below gets its next_reminder_at moved past now (or cleared), so this loop ends
+                tasks = (Task.query.options(joinedload(Task.user))
+                         .filter(Task.next_reminder_at <= now)
+                         .order_by(Task.next_reminder_at, Task.id)
+                         .limit(REMINDER_CHUNK_SIZE)
+                         .all())
+                if not tasks:
+                    break
+
+                for task in tasks:
+                    user = task.user
+                    # feature_mask came with the joined user row, no query per task
+                    enabled = reminders_enabled(user)
+                    days_left = task.due_reminder(now) if enabled and not task.completed and task.due_date else None
+                    if days_left:
+                        try:
+                            # Once connecting has failed the rest of this run's emails wait for the retry too
+                            if connect_error is not None:
+                                raise connect_error
+                            if connection is None:
+                                try:
+                                    connection = stack.enter_context(mail.connect())
+                                except Exception as e:
+                                    connect_error = e
+                                    raise
+                            send_reminder_email(user.username, user.email, task.task, task.due_date, days_left, connection=connection)
+                        except Exception as e:
+                            print(f"Failed to send {days_left}-day reminder for task {task.id}: {e}")
+                            task.next_reminder_at = now + REMINDER_RETRY_DELAY
+                            continue
+                        task.mark_reminder_sent(days_left)
+                    task.schedule_next_reminder(enabled, now)
 
-            elif hours_until_due <= 24 and not task.reminder_sent_1:
-                try:
-                    send_reminder_email(user.username, recipient, task.task, task.due_date, 1)
-                    task.reminder_sent_1 = True
-                except Exception as e:
-                    print(f"Failed to send 1-day reminder for task {task.id}: {e}")
+                db.session.commit()
 
-        db.session.commit()
+                # Every task above should have moved past now, if none did the next query would return the
+                # same chunk again, so stop instead of spinning
+                if all(task.next_reminder_at is not None and task.next_reminder_at <= now for task in tasks):
+                    print(f"send_reminders: {len(tasks)} tasks still due after being handled, stopping this run")
+                    break
+
+@app.cli.command("backfill-reminders")
+def backfill_reminders():
+    # Fills next_reminder_at for tasks that existed before the column did.
+    # Only users who get reminders have anything to fill, everyone else's tasks stay NULL
+    users = User.query.join(Task).filter(
+        entitled("task_reminder"), User.email.isnot(None), Task.completed == False, Task.due_date.isnot(None)
+    ).distinct()
+    for user in users:
+        reschedule_reminders(user)
+    db.session.commit()
+    print("Reminder schedule backfilled")
 
-def send_reminder_email(username, to_email, task_name, due_date, days_left):
+def send_reminder_email(username, to_email, task_name, due_date, days_left, connection=None):
     subject = f"Reminder: '{task_name}' is due in {days_left} day(s)"
     body = f"""
     Hey {username},
@@ -584,37 +647,41 @@ def send_reminder_email(username, to_email, task_name, due_date, days_left):
         recipients=[to_email],
         body=body
     )
-    mail.send(msg)
+    if connection is not None:
+        connection.send(msg)
+    else:
+        mail.send(msg)
 
 #Unit Converter
 @app.route('/unit-converter', methods=['GET', 'POST'])
 def unit_converter():
     if "username" not in session:
         return redirect(url_for('home'))
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     converter_types = ["distance", "temperature", "weight", "volume", "time", "speed", "area", "pressure", "energy", "power"]
     unlocked = {c.converter_type for c in UserConverterUnlock.query.filter_by(user_id=current_user.id).all()}
     selected_type = request.form.get('selected_type') or request.args.get('type')
     result = error = None #By default result and error are None so it does not show any errors or results
 
     if request.method == 'POST':
-        if not check():
+        if not has_points(current_user):
             flash("You do not have enough points to enter this feature", "point_error")
             return redirect(url_for('main'))
         if 'unlock_type' in request.form:
             unlock_type = request.form['unlock_type']
             user_answer = request.form.get('answer', '').strip()
             correct_answer = Converter_Questions[unlock_type]['answer']
+            # Every answer costs a point, right or wrong
+            if not spend_points(current_user, 1, f'converter_answer:{unlock_type}'):
+                flash("You do not have enough points to enter this feature", "point_error")
+                return redirect(url_for('main'))
             if user_answer == correct_answer:
                 db.session.add(UserConverterUnlock(user_id=current_user.id, converter_type=unlock_type))
                 db.session.commit()
                 flash(f"{unlock_type.capitalize()} converter unlocked!")
                 unlocked.add(unlock_type)
-                current_user.points -= 1
-                db.session.commit()
             else:
                 flash("Incorrect answer. Try again. Also, it deducts one point when you answer it incorrectly hehe. Also, I didn't add JS so that's why it reloads everytime.", "error")
-                current_user.points -= 1
                 db.session.commit()
         elif 'converter_type' in request.form:
             converter_type = request.form['converter_type']
@@ -623,11 +690,16 @@ def unit_converter():
                     value = float(request.form['value'])
                     from_unit = request.form['from_unit']
                     to_unit = request.form['to_unit']
-                    converted = convert_units_api_ninjas(value, from_unit, to_unit)
+                    try:
+                        converted = round(convert_units(converter_type, value, from_unit, to_unit), 6) + 0.0  # + 0.0 turns -0.0 into 0.0
+                    except UnknownUnitError:
+                        converted = convert_units_api_ninjas(value, from_unit, to_unit) if USE_API_NINJAS_FALLBACK else None
                     if converted is not None:
                         result = f"{value} {from_unit} is equal to {converted} {to_unit}"
                     else:
                         error = "Conversion failed. Please check the units and try again."
+                except ConversionError as e:
+                    error = f"Conversion failed: {e}"
                 except ValueError:
                     error = "Invalid input. Please enter a number."
             else:
@@ -635,12 +707,51 @@ def unit_converter():
     return render_template('tools/unit_converter.html', user=current_user, converter_types=converter_types, selected_type=selected_type, questions=Converter_Questions, result=result, error=error, unlocked=unlocked)
 
 #Blog
+BLOG_PAGE_SIZE = 20
+BLOG_MAX_PAGE_SIZE = 100
+
+# Cursor is "<timestamp>_<id>" of the last row on the previous page, newest rows come first
+def encode_cursor(row):
+    return f"{row.timestamp.isoformat()}_{row.id}"
+
+def decode_cursor(cursor):
+    try:
+        ts, msg_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(ts), int(msg_id)
+    except (AttributeError, ValueError):
+        return None
+
+def load_blog_page(cursor=None, limit=BLOG_PAGE_SIZE):
+    # Authors come in with the posts (join) and all comments + their authors in one extra query,
+    # so a page is always 2 queries no matter how many posts or comments there are
+    query = Messages.query.options(
+        joinedload(Messages.user),
+        selectinload(Messages.comments).joinedload(BlogComment.author)
+    )
+
+    return paginate_by_cursor(query, Messages, cursor, limit)
+
+def paginate_by_cursor(query, model, cursor, limit):
+    # Keyset pagination over (timestamp, id) newest first, returns (rows, next_cursor)
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        ts, row_id = position
+        query = query.filter(or_(
+            model.timestamp < ts,
+            and_(model.timestamp == ts, model.id < row_id)
+        ))
+
+    # Grab one extra row to know if there is another page
+    rows = query.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
 @app.route('/blog', methods=['GET', 'POST'])
 def blog():
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
 
     if request.method == 'POST':
         content = request.form.get('content')
@@ -659,9 +770,8 @@ def blog():
 
         elif 'content' in request.form:
             if content:
-                new_msg = Messages(content=content.strip(), user=current_user)
-                if check():
-                    current_user.points -= 1
+                if spend_points(current_user, 1, 'blog_post'):
+                    new_msg = Messages(content=content.strip(), user=current_user)
                     db.session.add(new_msg)
                     db.session.commit()
                     return redirect(url_for('blog'))
@@ -670,65 +780,131 @@ def blog():
                     return redirect(url_for('blog'))
 
 
-    messages = Messages.query.order_by(Messages.timestamp.desc()).all() #Descending order first
-    return render_template("blog.html", user=current_user, messages=messages)
+    messages, next_cursor = load_blog_page(request.args.get('cursor'))
+    return render_template("blog.html", user=current_user, messages=messages, next_cursor=next_cursor)
+
+@app.route('/blog/feed')
+def blog_feed():
+    if "username" not in session:
+        return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+
+    try:
+        limit = min(max(int(request.args.get('limit', BLOG_PAGE_SIZE)), 1), BLOG_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = BLOG_PAGE_SIZE
+    messages, next_cursor = load_blog_page(request.args.get('cursor'), limit)
+
+    posts = [{
+        'id': msg.id,
+        'content': msg.content,
+        'timestamp': msg.timestamp.isoformat(),
+        'author': msg.user.username,
+        'comments': [{
+            'id': comment.id,
+            'content': comment.content,
+            'timestamp': comment.timestamp.isoformat(),
+            'author': comment.author.username,
+        } for comment in msg.comments]
+    } for msg in messages]
+    return jsonify({'status': 'success', 'posts': posts, 'next_cursor': next_cursor})
 
 
 #Random stuff
+# Facts come from the local corpus (cat_facts.py), catfact.ninja is only crawled by the background job
+CAT_FACT_REFRESH_MINUTES = 60
+CAT_FACT_LEASE = timedelta(minutes=CAT_FACT_REFRESH_MINUTES * 1.5)
+
+@scheduler.task('interval', id='refresh_cat_facts', minutes=CAT_FACT_REFRESH_MINUTES)
+@leased_job(app, 'refresh_cat_facts', CAT_FACT_LEASE)
+def refresh_cat_facts():
+    cat_fact_corpus.refill(heartbeat=lambda: renew_lease('refresh_cat_facts', CAT_FACT_LEASE))
+
 @app.route('/cat', methods=['GET', 'POST'])
 def cat():
     cat_fact = "Click the button to learn something about cats!"
+    message = None
     if request.method == 'POST':
-        cat_facts_url = "https://catfact.ninja/fact"
-        response = requests.get(cat_facts_url)
-        if response.status_code == 200: #if the request was successful
-            cat_fact = response.json()["fact"] #This gets the json data from the request and gets the fact key
+        new_fact = request.form.get('new_fact')
+        if new_fact is not None:
+            # Users can add their own cat facts to the same corpus
+            user = get_current_user()
+            if not user:
+                message = "Log in to add your own cat facts."
+            else:
+                try:
+                    cat_fact_corpus.add_user_fact(new_fact, user)
+                    message = "Thanks! Your fact was added."
+                except InvalidFact as e:
+                    message = str(e)
         else:
-            cat_fact = "Could not fetch cat facts at the moment. Please try again later."
-    return render_template('cat.html', cat_fact=cat_fact)
+            cat_fact = cat_fact_corpus.random_fact() or "Could not fetch cat facts at the moment. Please try again later."
+    return render_template('cat.html', cat_fact=cat_fact, message=message)
 
-#Add the feature that users are allowed to add their own cat facts
 
 #Currency Exchange
+# Rates come from the cached USD table in currency.py, the upstream is hit about once an hour
+CURRENCY_BATCH_LIMIT = 500
+
 @app.route('/currency', methods=['GET', 'POST'])
 def currency_rate():
     exchange_data = None
     error = None
 
     if request.method == 'POST':
-        base_currency = request.form['base_currency']
-        target_currency = request.form['target_currency']
+        base_currency = request.form['base_currency'].strip().upper()
+        target_currency = request.form['target_currency'].strip().upper()
         amount = float(request.form['amount'])  # Amount of base currency
-        url = f"https://v6.exchangerate-api.com/v6/134c221bed30d8402bb59b76/latest/{base_currency}"
 
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                rates = response.json()
-                if target_currency in rates["conversion_rates"]:
-                    target_rate = rates["conversion_rates"][target_currency]
-                    calculated_amount = round(amount * target_rate, 2)  # Calculate the exchanged amount
-                    exchange_data = {
-                        "base": base_currency,
-                        "target": target_currency,
-                        "rate": target_rate,
-                        "amount": amount,
-                        "calculated_amount": calculated_amount
-                    }
-                else:
-                    error = f"Currency '{target_currency}' not found in exchange rates!"
-            else:
-                error = "Failed to grab the information, check ur API."
-        except requests.exceptions.RequestException as e:
+            target_rate = rate_table.rate(base_currency, target_currency)
+            calculated_amount = round(amount * target_rate, 2)  # Calculate the exchanged amount
+            exchange_data = {
+                "base": base_currency,
+                "target": target_currency,
+                "rate": target_rate,
+                "amount": amount,
+                "calculated_amount": calculated_amount
+            }
+        except UnknownCurrency as e:
+            error = str(e)
+        except RatesUnavailable:
             error = "Currency exchange service is unavailable"
     return render_template('currency.html', exchange_data=exchange_data, error=error)
 
+@app.route('/currency/batch', methods=['POST'])
+def currency_batch():
+    # Body: {"conversions": [{"amount": 10, "from": "USD", "to": "EUR"}, ...]}
+    data = request.get_json(silent=True) or {}
+    conversions = data.get('conversions')
+    if not isinstance(conversions, list):
+        return jsonify({'status': 'error', 'message': 'Expected a "conversions" list'}), 400
+    if len(conversions) > CURRENCY_BATCH_LIMIT:
+        return jsonify({'status': 'error', 'message': f'At most {CURRENCY_BATCH_LIMIT} conversions per request'}), 400
+
+    try:
+        rate_table.rates()
+    except RatesUnavailable:
+        return jsonify({'status': 'error', 'message': 'Currency exchange service is unavailable'}), 503
+
+    results = []
+    for item in conversions:
+        try:
+            amount = float(item['amount'])
+            rate = rate_table.rate(item['from'], item['to'])
+            results.append({'from': item['from'].upper(), 'to': item['to'].upper(), 'amount': amount,
+                            'rate': rate, 'converted': round(amount * rate, 2)})
+        except UnknownCurrency as e:
+            results.append({'error': str(e)})
+        except (KeyError, TypeError, ValueError, AttributeError):
+            results.append({'error': 'Each conversion needs amount, from and to'})
+
+    return jsonify({'status': 'success', 'results': results, 'rates_as_of': rate_table.fetched_at.isoformat() + 'Z',
+                    'stale': rate_table.is_stale()})
+
 
 @app.route('/zhongyan')
 def zhongyan():
-    if "username" in session:
-        current_user = User.query.filter_by(username=session['username']).first()
-    return render_template('zhongyan.html', user=current_user)
+    return render_template('zhongyan.html', user=get_current_user())
 
 
 @app.route('/shop')
@@ -736,7 +912,7 @@ def shop():
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     features = Feature.query.all()
     return render_template('shop.html', username=session['username'], user=current_user, features = features)
 
@@ -745,15 +921,15 @@ def purchase_feature(feature_id):
     if "username" not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
     feature = Feature.query.get_or_404(feature_id)
 
     if feature.key == "trivia_freezer":
-        if current_user.points >= feature.cost:
-            current_user.points -= feature.cost
-            current_user.trivia_freezers += 1
+        if spend_points(current_user, feature.cost, 'feature:trivia_freezer'):
+            add_trivia_freezer(current_user)
+            freezers = current_user.trivia_freezers
             db.session.commit()
-            flash(f"You bought a Trivia Freezer! You now have {current_user.trivia_freezers}.", f"feature-{feature.id}")
+            flash(f"You bought a Trivia Freezer! You now have {freezers}.", f"feature-{feature.id}")
         else:
             flash("Not enough points to buy a Trivia Freezer!", f"feature-{feature.id}")
         return redirect(url_for('shop'))
@@ -763,13 +939,22 @@ def purchase_feature(feature_id):
         flash("You need to add an email address to your account before purchasing Task Reminder. Please add your email in the main dashboard.", f"feature-{feature.id}")
         return redirect(url_for('shop'))
 
-    if feature in current_user.purchased_features:
+    if has_feature(current_user, feature.key):
         flash("You already have this feature")
         return redirect(url_for('shop'))
 
-    if current_user.points >= feature.cost:
-        current_user.points -= feature.cost
-        current_user.purchased_features.append(feature)
+    if not key_bit(feature.key):
+        flash(f"{feature.name} can't be bought right now", f"feature-{feature.id}")
+        return redirect(url_for('shop'))
+
+    if spend_points(current_user, feature.cost, f'feature:{feature.key}'):
+        # Another request bought it in the meantime, the rollback gives the points back
+        if not grant_feature(current_user, feature.id):
+            db.session.rollback()
+            flash("You already have this feature")
+            return redirect(url_for('shop'))
+        if feature.key == "task_reminder":
+            reschedule_reminders(current_user)
         db.session.commit()
         flash(f"You successfully purchased the feature: {feature.name}", f"feature-{feature.id}")
     else:
@@ -778,13 +963,17 @@ def purchase_feature(feature_id):
     return redirect(url_for('shop'))
 
 def reward_random_feature():
-    user = User.query.filter_by(username=session['username']).first()
-    owned_ids = {f.id for f in user.purchased_features}
+    user = get_current_user()
     all_features = Feature.query.all()
-    available = [f for f in all_features if f.id not in owned_ids]
+    # Features that don't fit in the feature mask (key_bit 0) can't be handed out
+    available = [f for f in all_features if key_bit(f.key) and not has_feature(user, f.key)]
     if available:
         selected = random.choice(available)
-        user.purchased_features.append(selected)
+        # Another request granted it first, nothing to celebrate
+        if not grant_feature(user, selected.id):
+            return
+        if selected.key == "task_reminder":
+            reschedule_reminders(user)
         flash(f"Congrats! You unlocked a free feature: {selected.name}")
         db.session.commit()
 
@@ -805,7 +994,7 @@ def trivia():
     if "username" not in session:
         return redirect(url_for('home'))
 
-    user = User.query.filter_by(username=session['username']).first()
+    user = get_current_user()
     streak = TriviaStreak.query.filter_by(user_id=user.id).first()
     if not streak:
         streak = TriviaStreak(user_id=user.id)
@@ -832,7 +1021,8 @@ def trivia():
             question=question,
             user_answer=user_answer,
             correct_answer=correct_answer,
-            was_correct=was_correct
+            was_correct=was_correct,
+            category=session.get('question_category')
         )
         db.session.add(history)
         streak.daily_count += 1
@@ -840,18 +1030,21 @@ def trivia():
 
         if was_correct:
             streak.current_streak += 1
-            user.points += reward_points(streak.current_streak)
+            award_points(user, reward_points(streak.current_streak), 'trivia_correct')
+            new_best = streak.current_streak > streak.max_streak
             streak.max_streak = max(streak.max_streak, streak.current_streak)
             feedback = f"Correct! +1 point"
         else:
-            user.points = max(user.points - 1, 0)
-            if user.trivia_freezers > 0:
-                user.trivia_freezers -= 1
+            # Never below zero, with no points left a wrong answer just costs nothing
+            spend_points(user, 1, 'trivia_wrong')
+            if use_trivia_freezer(user):
                 feedback = f"Wrong! But your Trivia Freezer saved your streak. ({user.trivia_freezers} left)"
             else:
                 streak.current_streak = 0
                 feedback = f"Wrong. The correct answer was: {correct_answer}. -1 point"
         db.session.commit()
+        if was_correct and new_best:
+            leaderboard.record(user.id, user.username, streak.max_streak)
 
 
 
@@ -863,30 +1056,31 @@ def trivia():
             streak=streak
         )
 
-    MAX_TRIES = 3
-    question_data = None
+    # Questions come out of the prefetched pool, opentdb is only called here when the pool is completely empty
+    q = question_pool.get()
+    if q is None:
+        try:
+            question_pool.refill()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Trivia refill failed: {e}")
+        q = question_pool.get()
 
-    for _ in range(MAX_TRIES):
-        trivia_response = requests.get("https://opentdb.com/api.php?amount=1&type=multiple")
-        data = trivia_response.json()
-        print("TRIVIA API RESPONSE:", data)
-
-        if data.get("response_code") == 0 and data.get("results"):
-            q = data["results"][0]
-            question = q["question"]
-            correct_answer = q["correct_answer"]
-            choices = q["incorrect_answers"] + [correct_answer]
-            random.shuffle(choices)
-
-            session['correct_answer'] = correct_answer
-            session['question'] = question
-
-            question_data = {
-                "question": question,
-                "choices": choices,
-                "correct_answer": correct_answer
-            }
-            break
+    question_data = None
+    if q:
+        question = q["question"]
+        correct_answer = q["correct_answer"]
+        choices = q["incorrect_answers"] + [correct_answer]
+        random.shuffle(choices)
+
+        session['correct_answer'] = correct_answer
+        session['question'] = question
+        session['question_category'] = q.get("category")
+
+        question_data = {
+            "question": question,
+            "choices": choices,
+            "correct_answer": correct_answer
+        }
 
     if not question_data:
         flash("Trivia question not available. Try again later.", "error")
@@ -897,57 +1091,92 @@ def trivia():
 
 @app.route('/trivia-leaderboard')
 def trivia_leaderboard():
-    top_users = (
-        db.session.query(User.username, TriviaStreak.max_streak)
-        .join(TriviaStreak)
-        .order_by(TriviaStreak.max_streak.desc())
-        .limit(10)
-        .all()
-    )
-    return render_template("trivia/trivia_leaderboard.html", top_users=top_users)
+    page = max(request.args.get('page', 1, type=int), 1)
+    top_users = leaderboard.top(limit=LEADERBOARD_PAGE_SIZE, offset=(page - 1) * LEADERBOARD_PAGE_SIZE)
+    my_rank = my_max_streak = None
+    if "username" in session:
+        my_rank, my_max_streak = leaderboard.rank(get_current_user().id)
+    return render_template("trivia/trivia_leaderboard.html", top_users=top_users, page=page,
+                           has_next=len(top_users) == LEADERBOARD_PAGE_SIZE, my_rank=my_rank, my_max_streak=my_max_streak)
+
+@app.route('/trivia-leaderboard/me')
+def trivia_leaderboard_rank():
+    if "username" not in session:
+        return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+    rank, max_streak = leaderboard.rank(get_current_user().id)
+    return jsonify({'status': 'success', 'rank': rank, 'max_streak': max_streak, 'players': leaderboard.total()})
+
+TRIVIA_HISTORY_PAGE_SIZE = 25
+TRIVIA_STATS_DAYS = 30
+# A category needs this many answers before it can show up as best/worst
+TRIVIA_STATS_MIN_ANSWERS = 3
 
 @app.route('/trivia-history')
 def trivia_history():
-    user = User.query.filter_by(username=session['username']).first()
-    history = TriviaHistory.query.filter_by(user_id=user.id).order_by(TriviaHistory.timestamp.desc()).all()
-    return render_template('trivia/trivia_history.html', history=history)
-
-
-with app.app_context():
-    features = [
-        Feature(name="Update Task", description="Unlock the ability to update task names.", cost=100, key="update_task"),
-        Feature(name="Tags", description="You can add tags to your tasks.", cost=250, key="add_tags"),
-        Feature(name="Task Reminder", description="Sends you emails to remind you of tasks.", cost=500, key="task_reminder"),
-        Feature(name="Blog", description="You can now talk to people!", cost=100, key="blog"),
-        Feature(name="Dark Mode", description="You can now use Dark Mode in dashboard!", cost=50, key="dark_mode"),
-        Feature(name="Trivia Freezer", description="Protects your trivia streak from breaking once.", cost=100, key="trivia_freezer")
-    ]
-
-    for feat in features:
-        if not Feature.query.filter_by(key=feat.key).first():
-            db.session.add(feat)
-
-    for user in User.query.all():
-        if user.trivia_streak is None:
-            new_streak = TriviaStreak(
-                user_id=user.id,
-                current_streak=0,
-                max_streak=0,
-                daily_count=0,
-                last_played=datetime.now()
-            )
-            db.session.add(new_streak)
-            user.trivia_streak = new_streak  # associate it with the user
-        else:
-            user.trivia_streak.current_streak = 0
-            user.trivia_streak.max_streak = 0
-            user.trivia_streak.daily_count = 0
-            user.trivia_streak.last_played = datetime.now()
+    if "username" not in session:
+        return redirect(url_for('home'))
 
-    db.session.commit()
-    print("Database updated with features!")
+    user = get_current_user()
+    history, next_cursor = paginate_by_cursor(TriviaHistory.query.filter_by(user_id=user.id), TriviaHistory,
+                                              request.args.get('cursor'), TRIVIA_HISTORY_PAGE_SIZE)
+    return render_template('trivia/trivia_history.html', history=history, next_cursor=next_cursor)
+
+@app.route('/trivia-history/stats')
+def trivia_history_stats():
+    if "username" not in session:
+        return jsonify({'status': 'error', 'message': 'Not logged in'}), 401
+
+    user = get_current_user()
+    correct = func.sum(case((TriviaHistory.was_correct == True, 1), else_=0))
+
+    # Everything is grouped and counted by the database, no history rows are loaded
+    total, total_correct = (db.session.query(func.count(TriviaHistory.id), correct)
+                            .filter(TriviaHistory.user_id == user.id)
+                            .one())
+    total_correct = total_correct or 0
+
+    since = datetime.now() - timedelta(days=TRIVIA_STATS_DAYS)
+    day = func.date(TriviaHistory.timestamp)
+    per_day = (db.session.query(day, func.count(TriviaHistory.id), correct)
+               .filter(TriviaHistory.user_id == user.id, TriviaHistory.timestamp >= since)
+               .group_by(day)
+               .order_by(day)
+               .all())
+
+    answered = func.count(TriviaHistory.id)
+    accuracy = correct * 1.0 / answered
+    categories = (db.session.query(TriviaHistory.category, answered, correct, accuracy)
+                  .filter(TriviaHistory.user_id == user.id, TriviaHistory.category.isnot(None))
+                  .group_by(TriviaHistory.category)
+                  .having(answered >= TRIVIA_STATS_MIN_ANSWERS))
+    best = categories.order_by(accuracy.desc(), answered.desc()).limit(3).all()
+    worst = categories.order_by(accuracy, answered.desc()).limit(3).all()
+
+    def category_stats(rows):
+        return [{'category': name, 'answered': count, 'correct': right, 'accuracy': round(acc, 3)} for name, count, right, acc in rows]
+
+    return jsonify({
+        'status': 'success',
+        'answered': total,
+        'correct': total_correct,
+        'accuracy': round(total_correct / total, 3) if total else None,
+        'per_day': [{'date': str(d), 'answered': count, 'correct': right or 0} for d, count, right in per_day],
+        'best_categories': category_stats(best),
+        'worst_categories': category_stats(worst),
+    })
+
+@app.cli.command("seed")
+@click.option("--force", is_flag=True, help="Run even if this seed version was already applied.")
+def seed_command(force):
+    # Seed data lives in seed.py and is applied here (once per SEED_VERSION), never on import
+    counts = run_seed(force=force)
+    if counts is None:
+        print(f"Seed version {SEED_VERSION} already applied, nothing to do")
+    else:
+        print(f"Seed version {SEED_VERSION} applied: {counts['features']} features added, {counts['features_updated']} updated, {counts['trivia_streaks']} trivia streaks added")
 
 if __name__ in '__main__':
     with app.app_context():
         db.create_all()
+        run_seed()
     app.run(port=5001)
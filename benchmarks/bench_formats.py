@@ -0,0 +1,112 @@
+# Times every from -> to conversion in tools/formats.py over a few document sizes.
+#
+#   python benchmarks/bench_formats.py                      print the table
+#   python benchmarks/bench_formats.py --save base.json     also store the timings
+#   python benchmarks/bench_formats.py --compare base.json  flag pairs that got slower than the stored run
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import formats  # noqa: E402
+
+SIZES = {"small": 10, "medium": 1000, "large": 20000}
+# A pair counts as a regression when it is this much slower than the saved run
+REGRESSION_THRESHOLD = 1.25
+
+
+def records(n):
+    return [{"id": str(i), "name": f"user{i}", "email": f"user{i}@example.com", "score": str(i * 7 % 101)} for i in range(n)]
+
+
+def sample_documents(n):
+    # Not every format can hold every shape (CSV wants a list of rows, TOML a table, INI a flat dict),
+    # each pair uses the first shape both of its formats can handle
+    rows = records(n)
+    return [rows, {"records": rows}, {f"key{i}": f"value{i}" for i in range(n)}]
+
+
+def source_text(from_format, to_format, n):
+    for doc in sample_documents(n):
+        try:
+            text = formats.CODECS[from_format].emit(doc)
+            formats.convert(text, from_format, to_format)
+            return text
+        except Exception:
+            continue
+    return None
+
+
+def time_pair(text, from_format, to_format, min_time=0.2):
+    runs, start = 0, time.perf_counter()
+    while True:
+        formats.convert(text, from_format, to_format)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def run(sizes):
+    results = {}
+    for size_name, n in sizes.items():
+        for from_format in formats.CODECS:
+            for to_format in formats.CODECS:
+                key = f"{from_format}->{to_format}:{size_name}"
+                text = source_text(from_format, to_format, n)
+                if text is None:
+                    results[key] = None
+                    continue
+                seconds = time_pair(text, from_format, to_format)
+                results[key] = {"seconds": seconds, "mb_per_s": len(text.encode()) / seconds / 1e6}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark format conversions")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated subset of " + ", ".join(SIZES))
+    parser.add_argument("--save", help="write the timings to this JSON file")
+    parser.add_argument("--compare", help="compare against timings saved earlier with --save")
+    args = parser.parse_args()
+
+    sizes = {name: SIZES[name] for name in args.sizes.split(",")}
+    import yaml
+    print(f"orjson: {formats.orjson is not None}, libyaml: {hasattr(yaml, 'CSafeLoader')}, "
+          f"tomllib: {importlib.util.find_spec('tomllib') is not None}")
+
+    results = run(sizes)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print(f"{'pair':<28}{'ms/op':>12}{'MB/s':>10}{'vs base':>10}")
+    for key, result in results.items():
+        if result is None:
+            print(f"{key:<28}{'n/a':>12}")
+            continue
+        line = f"{key:<28}{result['seconds'] * 1000:>12.3f}{result['mb_per_s']:>10.2f}"
+        base = baseline.get(key)
+        if base:
+            ratio = result["seconds"] / base["seconds"]
+            line += f"{ratio:>9.2f}x"
+            if ratio > REGRESSION_THRESHOLD:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"{regressions} pair(s) slower than the baseline by more than {REGRESSION_THRESHOLD}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
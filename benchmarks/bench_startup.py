@@ -0,0 +1,104 @@
+# Cold start timings, every number comes from a fresh Python process like a new serverless instance.
+#
+#   python benchmarks/bench_startup.py                      print the table
+#   python benchmarks/bench_startup.py --save base.json     also store the timings
+#   python benchmarks/bench_startup.py --compare base.json  flag steps that got slower than the stored run
+#
+# Needs config.py importable (run from the project root or put it on PYTHONPATH), same as the app.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import cost of each module on its own (includes everything it imports)
+MODULES = ["app", "tools.routes", "tools.formats", "units", "dashboard", "currency", "cat_facts", "http_client", "models"]
+
+# (name, setup, timed) - setup runs first and isn't counted, timed is the first use of something loaded lazily
+FIRST_USE = [
+    ("time to first response GET /", "", "import app; app.app.test_client().get('/')"),
+    ("first GET / after import", "import app; client = app.app.test_client()", "client.get('/')"),
+    ("units first conversion", "from units import convert_units", "convert_units('distance', 1, 'km', 'mi')"),
+    ("yaml first parse", "from tools.formats import convert", "convert('a: 1', 'yaml', 'json')"),
+    ("xml first parse", "from tools.formats import convert", "convert('<a>1</a>', 'xml', 'json')"),
+    ("toml first parse", "from tools.formats import convert", "convert('a = 1', 'toml', 'json')"),
+    ("pycountry first lookup", "from dashboard import country_name", "country_name('US')"),
+    ("google oauth client", "import app; ctx = app.app.test_request_context(); ctx.push()", "app.google_client()"),
+]
+
+# A step counts as a regression when it is this much slower than the saved run and by more than MIN_SLOWDOWN_MS,
+# single digit millisecond numbers jump around too much for a ratio alone
+REGRESSION_THRESHOLD = 1.25
+MIN_SLOWDOWN_MS = 20
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+{setup}
+start = time.perf_counter()
+{timed}
+print(time.perf_counter() - start)
+"""
+
+
+def time_in_fresh_process(setup, timed):
+    code = CHILD.format(root=ROOT, setup=setup, timed=timed)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(setup, timed, runs):
+    times = [time_in_fresh_process(setup, timed) for _ in range(runs)]
+    return {"median": statistics.median(times), "min": min(times)}
+
+
+def run(runs):
+    results = {}
+    for module in MODULES:
+        results[f"import {module}"] = measure("", f"import {module}", runs)
+    for name, setup, timed in FIRST_USE:
+        results[name] = measure(setup, timed, runs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start: import times and first use of lazy dependencies")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per step (median is reported)")
+    parser.add_argument("--save", help="write the timings to this JSON file")
+    parser.add_argument("--compare", help="compare against timings saved earlier with --save")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print(f"{'step':<30}{'median ms':>12}{'min ms':>10}{'vs base':>10}")
+    for key, result in results.items():
+        line = f"{key:<30}{result['median'] * 1000:>12.1f}{result['min'] * 1000:>10.1f}"
+        base = baseline.get(key)
+        if base:
+            ratio = result["median"] / base["median"]
+            line += f"{ratio:>9.2f}x"
+            if ratio > REGRESSION_THRESHOLD and (result["median"] - base["median"]) * 1000 > MIN_SLOWDOWN_MS:
+                line += "  REGRESSION"
+                regressions += 1
+        print(line)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"{regressions} step(s) slower than the baseline by more than {REGRESSION_THRESHOLD}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import hashlib
+import random
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from http_client import upstream
+from models import CatFact
+
+CAT_FACTS_URL = "https://catfact.ninja/facts"
+PAGE_LIMIT = 100
+# Pages crawled per background run, the crawl wraps around to page 1 after the last page
+PAGES_PER_RUN = 2
+FETCH_TIMEOUT = (3, 10)
+MIN_FACT_LENGTH = 10
+MAX_FACT_LENGTH = 500
+# Only one process runs the crawl job, the others pick up new rows from the table this often
+RELOAD_SECONDS = 10 * 60
+
+
+class InvalidFact(ValueError):
+    pass
+
+
+def fact_hash(fact):
+    # Same fact with different spacing or case counts as a duplicate
+    normalized = ' '.join(fact.lower().split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+# Every known cat fact, kept in a list so a random one is a single random.choice.
+# The cat_fact table is the real store; this process loads it on first use and the background
+# job adds new pages from catfact.ninja, so /cat never waits on the API.
+class CatFactCorpus:
+    def __init__(self):
+        self._facts = []
+        self._hashes = set()
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._loaded_at = None
+        self._max_id = 0
+        self._next_page = None  # worked out from the table on the first crawl, see _resume_page
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def _ensure_loaded(self):
+        # Everything on first use, afterwards only rows added since the last load
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < RELOAD_SECONDS:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < RELOAD_SECONDS:
+                return
+            rows = db.session.query(CatFact.id, CatFact.fact, CatFact.fact_hash).filter(CatFact.id > self._max_id).order_by(CatFact.id)
+            for row_id, fact, h in rows:
+                self._add(fact, h)
+                self._max_id = row_id
+            self._loaded_at = time.monotonic()
+
+    def _add(self, fact, h):
+        if h not in self._hashes:
+            self._hashes.add(h)
+            self._facts.append(fact)
+
+    def __len__(self):
+        return len(self._facts)
+
+    def random_fact(self):
+        self._ensure_loaded()
+        facts = self._facts
+        if not facts:
+            # Nothing stored yet, fetch in the background and let the page show its fallback text
+            self.refill_async()
+            return None
+        return random.choice(facts)
+
+    def add_user_fact(self, fact, user):
+        fact = ' '.join(fact.split())
+        if not MIN_FACT_LENGTH <= len(fact) <= MAX_FACT_LENGTH:
+            raise InvalidFact(f"Facts have to be between {MIN_FACT_LENGTH} and {MAX_FACT_LENGTH} characters.")
+        self._ensure_loaded()
+        h = fact_hash(fact)
+        if h in self._hashes or CatFact.query.filter_by(fact_hash=h).first():
+            raise InvalidFact("We already know that one!")
+        db.session.add(CatFact(fact=fact, fact_hash=h, source='user', user_id=user.id))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Someone stored the same fact between the check above and here
+            db.session.rollback()
+            raise InvalidFact("We already know that one!")
+        with self._lock:
+            self._add(fact, h)
+
+    def _resume_page(self):
+        # Pages are crawled in order and every new crawled fact is stored, so the count of crawled rows says
+        # how far the crawl got before a restart. Starts at the page holding the first fact we don't have
+        crawled = db.session.query(db.func.count(CatFact.id)).filter(CatFact.source == 'catfact').scalar()
+        return crawled // PAGE_LIMIT + 1
+
+    def refill_async(self):
+        if self._refill_lock.locked():
+            return
+        threading.Thread(target=self.refill_in_context, name='cat-fact-refill', daemon=True).start()
+
+    def refill_in_context(self):
+        with self._app.app_context():
+            try:
+                self.refill()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Cat fact refill failed: {e}")
+
+    def refill(self, pages=PAGES_PER_RUN, heartbeat=None):
+        # Crawls the next few pages of /facts and stores the facts we don't have yet.
+        # heartbeat is called before each page, the scheduled job renews its lease with it
+        with self._refill_lock:
+            self._ensure_loaded()
+            if self._next_page is None:
+                self._next_page = self._resume_page()
+            added = 0
+            for _ in range(pages):
+                if heartbeat is not None:
+                    heartbeat()
+                response = upstream.get(CAT_FACTS_URL, params={"page": self._next_page, "limit": PAGE_LIMIT}, timeout=FETCH_TIMEOUT)
+                response.raise_for_status()
+                data = response.json()
+
+                fresh = {}
+                for item in data.get("data", []):
+                    fact = ' '.join(item.get("fact", "").split())
+                    h = fact_hash(fact)
+                    if fact and h not in self._hashes:
+                        fresh[h] = fact
+                if fresh:
+                    # Another process may already have stored some of these
+                    stored = {h for (h,) in db.session.query(CatFact.fact_hash).filter(CatFact.fact_hash.in_(fresh))}
+                    db.session.add_all([CatFact(fact=fact, fact_hash=h, source='catfact') for h, fact in fresh.items() if h not in stored])
+                    try:
+                        db.session.commit()
+                        added += len(fresh) - len(stored)
+                    except IntegrityError:
+                        # A user added one of these just now, the page is picked up again on the next lap
+                        db.session.rollback()
+                    else:
+                        with self._lock:
+                            for h, fact in fresh.items():
+                                self._add(fact, h)
+
+                last_page = data.get("last_page") or 1
+                self._next_page = self._next_page + 1 if self._next_page < last_page else 1
+            return added
+
+
+cat_fact_corpus = CatFactCorpus()
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+import json
+import threading
+import requests
+from sqlalchemy.exc import SQLAlchemyError
+
+from extensions import db
+from http_client import upstream
+from models import ExchangeRateSnapshot
+
+EXCHANGE_RATE_URL = "https://v6.exchangerate-api.com/v6/134c221bed30d8402bb59b76/latest/{base}"
+# One table in this base is enough, every other pair is a cross rate off it
+TABLE_BASE = "USD"
+RATES_TTL = timedelta(hours=1)
+# While the upstream is failing, wait this long before trying it again and keep serving the old table
+RETRY_AFTER = timedelta(minutes=5)
+FETCH_TIMEOUT = (3, 10)
+
+
+def utc_now():
+    # Naive UTC, same as what the snapshot's DateTime column stores
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class RatesUnavailable(Exception):
+    pass
+
+
+class UnknownCurrency(ValueError):
+    pass
+
+
+class RateTable:
+    def __init__(self, base=TABLE_BASE):
+        self.base = base
+        self._rates = None
+        self._fetched_at = None
+        self._next_check = None
+        self._lock = threading.Lock()
+
+    @property
+    def fetched_at(self):
+        return self._fetched_at
+
+    def is_stale(self, now=None):
+        return self._fetched_at is None or (now or utc_now()) - self._fetched_at > RATES_TTL
+
+    def _load_snapshot(self):
+        snapshot = ExchangeRateSnapshot.query.filter_by(base=self.base).first()
+        if snapshot and (self._fetched_at is None or snapshot.fetched_at > self._fetched_at):
+            self._rates = json.loads(snapshot.rates)
+            self._fetched_at = snapshot.fetched_at
+
+    def _save_snapshot(self):
+        snapshot = ExchangeRateSnapshot.query.filter_by(base=self.base).first()
+        if snapshot is None:
+            snapshot = ExchangeRateSnapshot(base=self.base)
+            db.session.add(snapshot)
+        snapshot.rates = json.dumps(self._rates)
+        snapshot.fetched_at = self._fetched_at
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # Usually another worker inserting its snapshot at the same moment, the table in memory is fine either way
+            db.session.rollback()
+            print(f"Couldn't store the exchange rate snapshot: {e}")
+
+    def _fetch(self):
+        response = upstream.get(EXCHANGE_RATE_URL.format(base=self.base), timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("result") != "success" or "conversion_rates" not in data:
+            raise RatesUnavailable(f"Exchange rate API said: {data.get('error-type', 'unknown error')}")
+        return data["conversion_rates"]
+
+    def rates(self):
+        now = utc_now()
+        if not self.is_stale(now):
+            return self._rates
+
+        with self._lock:
+            if self._next_check and now < self._next_check and self._rates:
+                return self._rates
+            # Another worker may have stored a fresher table already, then there's no need to call the API
+            self._load_snapshot()
+            if not self.is_stale(now):
+                return self._rates
+
+            try:
+                self._rates = self._fetch()
+                self._fetched_at = now
+                self._next_check = None
+                self._save_snapshot()
+            except (requests.exceptions.RequestException, ValueError, RatesUnavailable) as e:
+                db.session.rollback()
+                print(f"Exchange rate refresh failed, serving the last snapshot: {e}")
+                self._next_check = now + RETRY_AFTER
+                if self._rates is None:
+                    raise RatesUnavailable("Currency exchange service is unavailable") from e
+            return self._rates
+
+    def rate(self, from_currency, to_currency):
+        rates = self.rates()
+        from_currency, to_currency = from_currency.strip().upper(), to_currency.strip().upper()
+        for code in (from_currency, to_currency):
+            if code not in rates:
+                raise UnknownCurrency(f"Currency '{code}' not found in exchange rates!")
+        return rates[to_currency] / rates[from_currency]
+
+    def convert(self, amount, from_currency, to_currency):
+        return amount * self.rate(from_currency, to_currency)
+
+
+rate_table = RateTable()
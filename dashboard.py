@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
+
+from config import IP_API_URL, GEO_API_URL, NEWS_API_URL, NEWS_API_KEY
+from cache import TTLCache
+from http_client import upstream
+
+# Whole dashboard data stage has to finish inside this many seconds, whatever is missing by then is skipped
+DASHBOARD_DEADLINE = 2.5
+CONNECT_TIMEOUT = 1.0
+
+# Server ip barely ever changes, country for an ip rarely, news every few minutes
+IP_TTL = 60 * 60
+GEO_TTL = 6 * 60 * 60
+NEWS_TTL = 15 * 60
+# An empty answer (failed lookup, private ip) is only remembered briefly so the next try can do better
+EMPTY_GEO_TTL = 60
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='dashboard')
+_ip_cache = TTLCache(IP_TTL, maxsize=1)
+_geo_cache = TTLCache(GEO_TTL)   # ip -> country code
+_news_cache = TTLCache(NEWS_TTL)  # country code -> articles
+
+
+def _get_json(url, deadline, **kwargs):
+    # upstream cuts the timeouts (and skips retries) to whatever is left of the deadline
+    response = upstream.get(url, timeout=(CONNECT_TIMEOUT, DASHBOARD_DEADLINE), deadline=deadline, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def lookup_ip(deadline):
+    ip = _ip_cache.get('ip')
+    if ip is None:
+        ip = _get_json(IP_API_URL, deadline).get("ip", "")
+        if ip:
+            _ip_cache.set('ip', ip)
+    return ip
+
+
+def lookup_country_code(deadline):
+    ip = lookup_ip(deadline)
+    country_code = _geo_cache.get(ip)
+    if country_code is None:
+        country_code = _get_json(f"{GEO_API_URL}{ip}", deadline).get("countryCode", "")
+        _geo_cache.set(ip, country_code, ttl=None if country_code else EMPTY_GEO_TTL)
+    return country_code
+
+
+def lookup_articles(country_code, deadline):
+    articles = _news_cache.get(country_code)
+    if articles is None:
+        news_data = _get_json(NEWS_API_URL, deadline, params={
+            "country": country_code.lower(),
+            "token": NEWS_API_KEY,
+            "max": 3
+        })
+        articles = news_data.get("articles", [])[:3]
+        _news_cache.set(country_code, articles)
+    return articles
+
+
+def country_name(country_code):
+    if not country_code:
+        return "Unknown"
+    import pycountry  # only needed here, loaded on first use
+    country_obj = pycountry.countries.get(alpha_2=country_code)
+    return country_obj.name if country_obj else "Unknown"
+
+
+def _result(future):
+    # Result of a finished future, None if it is still running or blew up
+    if not future.done():
+        return None
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Dashboard lookup failed: {e}")
+        return None
+
+
+def load_dashboard(timeout=DASHBOARD_DEADLINE):
+    deadline = time.monotonic() + timeout
+    data = {"country_code": "", "country": "Unknown", "articles": [], "partial": False}
+
+    ip = _ip_cache.get('ip')
+    known_code = _geo_cache.get(ip) if ip else None
+
+    # Everything cached, no upstream calls at all
+    if known_code is not None:
+        articles = _news_cache.get(known_code) if known_code else []
+        if articles is not None:
+            data.update(country_code=known_code, country=country_name(known_code), articles=articles)
+            return data
+
+    # The geo chain (ip -> country) and the news for the country we saw last time run side by side
+    country_future = _executor.submit(lookup_country_code, deadline)
+    news_futures = {}
+    if known_code:
+        news_futures[known_code] = _executor.submit(lookup_articles, known_code, deadline)
+
+    wait([country_future], timeout=max(deadline - time.monotonic(), 0))
+    country_code = _result(country_future)
+    if country_code is None:
+        data["partial"] = True
+        country_code = known_code or ""
+
+    if country_code:
+        if country_code not in news_futures:
+            news_futures[country_code] = _executor.submit(lookup_articles, country_code, deadline)
+        news_future = news_futures[country_code]
+        wait([news_future], timeout=max(deadline - time.monotonic(), 0))
+        articles = _result(news_future)
+        if articles is None:
+            data["partial"] = True
+        data["articles"] = articles or []
+
+    data["country_code"] = country_code
+    data["country"] = country_name(country_code)
+    return data
@@ -0,0 +1,80 @@
+from sqlalchemy import func, insert, update
+
+from cache import TTLCache
+from extensions import db
+from models import Feature, User, user_features
+
+# Which features a user owns is kept twice: user_features has a row per purchase, and user.feature_mask
+# has one bit per feature (bit feature.id - 1). The mask comes along with the user row that every request
+# loads anyway, so a check is a bit test instead of loading and scanning the user's Feature collection,
+# and bulk jobs can filter on it in SQL. Both are written together by grant_feature().
+
+# Features only change when `flask seed` runs, the key -> id map is reloaded this often
+CATALOG_TTL = 10 * 60
+# A BIGINT mask has room for features with ids up to this, features with bigger ids are left out
+# of the catalog (logged) and can't be owned until they get a smaller id
+MAX_FEATURE_ID = 63
+
+_catalog = TTLCache(CATALOG_TTL, maxsize=1)
+
+
+def feature_catalog():
+    # {feature key: feature id}, shared by the whole process
+    catalog = _catalog.get('features')
+    if catalog is None:
+        catalog = {}
+        for key, feature_id in db.session.query(Feature.key, Feature.id):
+            if feature_bit(feature_id):
+                catalog[key] = feature_id
+            else:
+                print(f"Feature {key} has id {feature_id}, which doesn't fit in the feature mask, skipping it")
+        _catalog.set('features', catalog)
+    return catalog
+
+
+def feature_bit(feature_id):
+    # 0 when the id doesn't fit in the mask
+    if not 1 <= feature_id <= MAX_FEATURE_ID:
+        return 0
+    return 1 << (feature_id - 1)
+
+
+def key_bit(key):
+    feature_id = feature_catalog().get(key)
+    return 0 if feature_id is None else feature_bit(feature_id)
+
+
+def has_feature(user, key):
+    bit = key_bit(key)
+    return bit != 0 and (user.feature_mask or 0) & bit != 0
+
+
+def feature_keys(user):
+    mask = user.feature_mask or 0
+    return {key for key, feature_id in feature_catalog().items() if mask & feature_bit(feature_id)}
+
+
+def entitled(key):
+    # SQL condition for "user owns this feature", e.g. User.query.filter(entitled("task_reminder"))
+    bit = key_bit(key)
+    return func.coalesce(User.feature_mask, 0).bitwise_and(bit) != 0
+
+
+def grant_feature(user, feature_id):
+    # Sets the bit only if it isn't set yet, in one UPDATE, so two purchases racing can't both go through.
+    # False when the user already has the feature. Not committed, callers commit with the payment.
+    bit = feature_bit(feature_id)
+    if not bit:
+        print(f"Feature id {feature_id} doesn't fit in the feature mask, not granting it")
+        return False
+    mask = func.coalesce(User.feature_mask, 0)
+    granted = db.session.execute(
+        update(User).where(User.id == user.id, mask.bitwise_and(bit) == 0).values(feature_mask=mask.bitwise_or(bit)),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    if not granted:
+        return False
+    db.session.execute(insert(user_features).values(user_id=user.id, feature_id=feature_id))
+    db.session.expire(user, ['feature_mask', 'purchased_features'])
+    return True
+
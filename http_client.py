@@ -0,0 +1,170 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Every call to a third party API goes through `upstream` below:
+# - one Session, so connections to each host are kept alive and reused (one pool per host)
+# - a timeout on every request unless the caller passes its own
+# - a couple of retries with jittered backoff for connection errors, timeouts and 429/5xx answers
+# - a circuit breaker per host, after repeated failures calls fail fast for a while instead of waiting on a dead provider
+
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read)
+POOL_SIZE = 20                # kept-alive connections per host
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.2
+BACKOFF_MAX = 2.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+# Breaker opens after this many failed calls in a row and lets one test call through after OPEN_SECONDS
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    # Subclass of ConnectionError so the existing `except RequestException` handlers cover it
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=FAILURE_THRESHOLD, open_seconds=OPEN_SECONDS):
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Half open: after the cool down one request is let through to see if the host is back
+            if time.monotonic() - self.opened_at >= self.open_seconds and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release(self):
+        # The call let through by allow() ended without telling us anything about the host
+        with self._lock:
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES, pool_size=POOL_SIZE):
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker()
+            return self._breakers[host]
+
+    def _backoff(self, attempt, response=None):
+        # Full jitter, so clients that failed together don't all retry at the same moment
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(int(retry_after), BACKOFF_MAX))
+        return delay
+
+    def request(self, method, url, timeout=None, retries=None, deadline=None, **kwargs):
+        # deadline is a time.monotonic() value the whole call (retries included) has to finish by
+        method = method.upper()
+        timeout = timeout or self.timeout
+        retries = self.retries if retries is None else retries
+        breaker = self.breaker(urlsplit(url).netloc)
+
+        attempt = 0
+        while True:
+            # Deadline first, allow() may hand out the half open trial and that has to be given back
+            call_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"Deadline passed before calling {url}")
+                connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+                call_timeout = (min(connect, remaining), min(read, remaining))
+
+            if not breaker.allow():
+                raise CircuitOpen(f"{urlsplit(url).netloc} is failing, not calling it for now")
+
+            response = None
+            recorded = False
+            try:
+                try:
+                    response = self.session.request(method, url, timeout=call_timeout, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    breaker.failure()
+                    recorded = True
+                    # A request that never connected can always be sent again, others only if repeating it is harmless
+                    if isinstance(e, requests.exceptions.ConnectTimeout):
+                        retryable = True
+                    elif isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                        retryable = method in IDEMPOTENT_METHODS
+                    else:
+                        retryable = False
+                    error = e
+                else:
+                    if response.status_code >= 500:
+                        breaker.failure()
+                    else:
+                        breaker.success()
+                    recorded = True
+                    retryable = response.status_code in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+                    error = None
+            finally:
+                # Anything else (a bad argument, an interrupt) mustn't leave the trial taken forever
+                if not recorded:
+                    breaker.release()
+
+            if not retryable or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+upstream = HttpClient()
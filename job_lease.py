@@ -0,0 +1,109 @@
+from datetime import datetime
+from functools import wraps
+import os
+import socket
+import traceback
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import JobLease, JobRun
+
+# Every worker process starts the scheduler, but a job only runs in the process holding its lease.
+# The holder renews the lease each time the job fires, and long jobs call renew_lease() as they go
+# (e.g. once per chunk); if that process dies the lease runs out and whichever process fires the job
+# next takes it over. Times are UTC so hosts in other timezones agree.
+
+# job_run rows kept per job, older ones are deleted after each run
+JOB_RUNS_KEPT = 100
+
+
+class LeaseLost(Exception):
+    # Raised by renew_lease() when another process has taken the lease over, the job has to stop
+    pass
+
+
+def lease_owner():
+    # Worked out on every call, gunicorn forks workers after the app is imported
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name, lease_for):
+    now = datetime.utcnow()
+    owner = lease_owner()
+    # Take the lease if it's ours already or has run out, in one UPDATE so two processes can't both win
+    taken = JobLease.query.filter(
+        JobLease.name == name,
+        db.or_(JobLease.owner == owner, JobLease.expires_at < now)
+    ).update({JobLease.owner: owner, JobLease.expires_at: now + lease_for}, synchronize_session=False)
+    if taken:
+        db.session.commit()
+        return True
+
+    # First run ever: whoever inserts the row first gets it
+    try:
+        db.session.add(JobLease(name=name, owner=owner, expires_at=now + lease_for))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def renew_lease(name, lease_for):
+    # Heartbeat for a running job: pushes expires_at out again, but only while the lease is still ours and
+    # hasn't run out. If it ran out someone else may have taken over already, so stop rather than run twice
+    now = datetime.utcnow()
+    renewed = JobLease.query.filter(
+        JobLease.name == name,
+        JobLease.owner == lease_owner(),
+        JobLease.expires_at >= now
+    ).update({JobLease.expires_at: now + lease_for}, synchronize_session=False)
+    db.session.commit()
+    if not renewed:
+        raise LeaseLost(f"Lost the lease on {name}")
+
+
+def prune_job_runs(name, keep=JOB_RUNS_KEPT):
+    # Everything older than the newest `keep` runs of this job
+    cutoff = db.session.query(JobRun.id).filter(JobRun.job == name).order_by(JobRun.id.desc()).offset(keep).limit(1).scalar()
+    if cutoff is not None:
+        JobRun.query.filter(JobRun.job == name, JobRun.id <= cutoff).delete(synchronize_session=False)
+
+
+def leased_job(app, name, lease_for):
+    # Wraps a scheduled job so it only runs while this process holds its lease, and records the run in job_run.
+    # lease_for should be longer than the job's interval so the holder renews it before it runs out
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with app.app_context():
+                if not acquire_lease(name, lease_for):
+                    return None
+
+                run = JobRun(job=name, owner=lease_owner(), started_at=datetime.utcnow())
+                db.session.add(run)
+                db.session.commit()
+                run_id = run.id
+                try:
+                    result = func(*args, **kwargs)
+                    status, error = 'success', None
+                except LeaseLost as e:
+                    # Whatever wasn't committed yet is left for the new holder
+                    db.session.rollback()
+                    print(f"Scheduled job {name} stopped: {e}")
+                    result, status, error = None, 'lost', None
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Scheduled job {name} failed: {e}")
+                    result, status, error = None, 'error', traceback.format_exc()
+
+                run = db.session.get(JobRun, run_id)
+                run.finished_at = datetime.utcnow()
+                run.status = status
+                run.error = error
+                prune_job_runs(name)
+                db.session.commit()
+                return result
+        return wrapper
+    return decorator
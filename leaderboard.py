@@ -0,0 +1,102 @@
+from bisect import insort
+import threading
+import time
+
+from extensions import db
+from models import User, TriviaStreak
+
+# How many top entries stay in memory, and how often they get re-read so other workers' updates show up
+CACHE_SIZE = 100
+REFRESH_SECONDS = 60
+PAGE_SIZE = 10
+
+
+# Top streaks kept sorted in memory. trivia() pushes every new max_streak in with record(),
+# so reads never sort the table; anything past the cached top goes to the max_streak index.
+class Leaderboard:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._entries = []  # (-max_streak, user_id, username), smallest first = best first
+        self._positions = {}  # user_id -> entry
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        rows = (db.session.query(User.id, User.username, TriviaStreak.max_streak)
+                .join(TriviaStreak, TriviaStreak.user_id == User.id)
+                .filter(TriviaStreak.max_streak > 0)
+                .order_by(TriviaStreak.max_streak.desc(), User.id)
+                .limit(self.size)
+                .all())
+        with self._lock:
+            self._entries = [(-row.max_streak, row.id, row.username) for row in rows]
+            self._positions = {entry[1]: entry for entry in self._entries}
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_SECONDS:
+            self._load()
+
+    def record(self, user_id, username, max_streak):
+        # Called after a user's max_streak went up
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            old = self._positions.pop(user_id, None)
+            if old is not None:
+                self._entries.remove(old)
+            full = len(self._entries) >= self.size
+            if full and (-max_streak, user_id) > self._entries[-1][:2]:
+                return
+            entry = (-max_streak, user_id, username)
+            insort(self._entries, entry)
+            self._positions[user_id] = entry
+            if len(self._entries) > self.size:
+                dropped = self._entries.pop()
+                self._positions.pop(dropped[1], None)
+
+    def top(self, limit=PAGE_SIZE, offset=0):
+        # List of {"rank", "username", "max_streak"}
+        self._ensure_fresh()
+        with self._lock:
+            cached = self._entries[offset:offset + limit]
+            covered = offset + limit <= len(self._entries) or len(self._entries) < self.size
+        if covered:
+            return [{"rank": offset + i + 1, "username": e[2], "max_streak": -e[0]} for i, e in enumerate(cached)]
+
+        rows = (db.session.query(User.username, TriviaStreak.max_streak)
+                .join(TriviaStreak, TriviaStreak.user_id == User.id)
+                .filter(TriviaStreak.max_streak > 0)
+                .order_by(TriviaStreak.max_streak.desc(), User.id)
+                .offset(offset)
+                .limit(limit)
+                .all())
+        return [{"rank": offset + i + 1, "username": row.username, "max_streak": row.max_streak} for i, row in enumerate(rows)]
+
+    def rank(self, user_id):
+        # (rank, max_streak) for one user, (None, 0) if they never got a streak
+        self._ensure_fresh()
+        with self._lock:
+            entry = self._positions.get(user_id)
+            if entry is not None:
+                return self._entries.index(entry) + 1, -entry[0]
+
+        max_streak = db.session.query(TriviaStreak.max_streak).filter(TriviaStreak.user_id == user_id).scalar() or 0
+        if not max_streak:
+            return None, 0
+        # Everyone strictly better plus ties with a smaller id, counted off the max_streak index
+        ahead = (db.session.query(db.func.count(TriviaStreak.id))
+                 .filter(db.or_(TriviaStreak.max_streak > max_streak,
+                                db.and_(TriviaStreak.max_streak == max_streak, TriviaStreak.user_id < user_id)))
+                 .scalar())
+        return ahead + 1, max_streak
+
+    def total(self):
+        return db.session.query(db.func.count(TriviaStreak.id)).filter(TriviaStreak.max_streak > 0).scalar()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+leaderboard = Leaderboard()
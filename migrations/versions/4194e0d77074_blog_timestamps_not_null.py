@@ -0,0 +1,55 @@
+"""blog timestamps not null
+
+Messages and comments without a timestamp get one (the oldest post's time, a comment its post's),
+then both columns become NOT NULL so the blog feed can page straight off ix_messages_timestamp_id.
+
+Revision ID: 4194e0d77074
+Revises: 36d9649f4692
+Create Date: 2026-10-18 06:55:27.042832
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4194e0d77074'
+down_revision = '36d9649f4692'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    messages = sa.table('messages', sa.column('id', sa.Integer), sa.column('timestamp', sa.DateTime))
+    comments = sa.table('blog_comment', sa.column('post_id', sa.Integer), sa.column('timestamp', sa.DateTime))
+
+    # Undated posts go before every dated one, in id order they keep among themselves
+    oldest = conn.execute(sa.select(sa.func.min(messages.c.timestamp))).scalar() or datetime.now()
+    conn.execute(messages.update().where(messages.c.timestamp.is_(None)).values(timestamp=oldest))
+    post_time = sa.select(messages.c.timestamp).where(messages.c.id == comments.c.post_id).scalar_subquery()
+    conn.execute(comments.update().where(comments.c.timestamp.is_(None)).values(timestamp=post_time))
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.alter_column('timestamp',
+               existing_type=sa.DateTime(),
+               nullable=False)
+
+    with op.batch_alter_table('blog_comment', schema=None) as batch_op:
+        batch_op.alter_column('timestamp',
+               existing_type=sa.DateTime(),
+               nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blog_comment', schema=None) as batch_op:
+        batch_op.alter_column('timestamp',
+               existing_type=sa.DateTime(),
+               nullable=True)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.alter_column('timestamp',
+               existing_type=sa.DateTime(),
+               nullable=True)
@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+import json
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -18,6 +19,13 @@ task_tags = db.Table(
 )
 
 
+# Reminder emails go out this long before a task is due, earliest first
+REMINDER_OFFSETS = ((7, timedelta(days=7)), (3, timedelta(days=3)), (1, timedelta(days=1)))
+# A reminder only goes out inside this window after its time, later it's skipped (a "due in 7 days"
+# email for a task due in 5 would be wrong) and the next one is waited for
+REMINDER_WINDOW = timedelta(days=1)
+
+
 # --- Models ---
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -31,6 +39,8 @@ class User(db.Model):
     trivia_history = db.relationship('TriviaHistory', backref='user', lazy=True)
     trivia_streak = db.relationship('TriviaStreak', backref='user', uselist=False)
     trivia_freezers = db.Column(db.Integer, default=0)
+    # One bit per owned feature, see entitlements.py
+    feature_mask = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -51,10 +61,57 @@ class Task(db.Model):
     reminder_sent_7 = db.Column(db.Boolean, default=False)
     reminder_sent_3 = db.Column(db.Boolean, default=False)
     reminder_sent_1 = db.Column(db.Boolean, default=False)
+    # When the next reminder email is due, NULL when there is nothing left to send
+    next_reminder_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    # Open task lists and tag searches are always per user, by completion, oldest first
+    __table_args__ = (db.Index('ix_task_user_completed_created', 'user_id', 'completed', 'date_created'),)
 
     def __repr__(self):
         return f'<Task {self.task}>'
 
+    def reminder_sent(self, days):
+        # True once that reminder was sent or its window passed without it
+        return bool(getattr(self, f'reminder_sent_{days}'))
+
+    def _open_reminders(self):
+        # Reminders after the latest one already sent or passed, earlier flags that are still unset don't count
+        # (older rows can have reminder_sent_1 set and the others not)
+        open_reminders = []
+        for days, offset in REMINDER_OFFSETS:
+            if self.reminder_sent(days):
+                open_reminders = []
+            else:
+                open_reminders.append((days, offset))
+        return open_reminders
+
+    def due_reminder(self, now):
+        # The reminder whose window is open right now, None if there is none
+        for days, offset in self._open_reminders():
+            starts = self.due_date - offset
+            if starts <= now < starts + REMINDER_WINDOW:
+                return days
+        return None
+
+    def mark_reminder_sent(self, days):
+        # Earlier reminders that were skipped over (task added late) count as sent too
+        for reminder_days, _ in REMINDER_OFFSETS:
+            if reminder_days >= days:
+                setattr(self, f'reminder_sent_{reminder_days}', True)
+
+    def schedule_next_reminder(self, enabled=True, now=None):
+        # next_reminder_at is the start of the next reminder window that hasn't closed yet, reminders whose
+        # window is already over are marked as passed. So it's only ever in the past while a window is open
+        self.next_reminder_at = None
+        if not enabled or self.completed or self.due_date is None:
+            return
+        now = now or datetime.now()
+        for days, offset in self._open_reminders():
+            starts = self.due_date - offset
+            if now < starts + REMINDER_WINDOW:
+                self.next_reminder_at = starts
+                return
+            self.mark_reminder_sent(days)
 
 class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -76,19 +133,22 @@ class Feature(db.Model):
 class Messages(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', backref='messages')
 
+    # Blog feed pages by (timestamp, id) newest first
+    __table_args__ = (db.Index('ix_messages_timestamp_id', 'timestamp', 'id'),)
+
 
 class BlogComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now)
+    timestamp = db.Column(db.DateTime, default=datetime.now, nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('messages.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('messages.id'), nullable=False, index=True)
     author = db.relationship('User', backref='blog_comments')
-    post = db.relationship('Messages', backref='comments')
+    post = db.relationship('Messages', backref=db.backref('comments', order_by='BlogComment.timestamp'))
 
 
 class TriviaHistory(db.Model):
@@ -99,13 +159,37 @@ class TriviaHistory(db.Model):
     correct_answer = db.Column(db.Text, nullable=False)
     was_correct = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.now)
+    category = db.Column(db.String(100), nullable=True)
+
+    # History pages and stats are always for one user, newest first
+    __table_args__ = (db.Index('ix_trivia_history_user_timestamp_id', 'user_id', 'timestamp', 'id'),)
+
+
+class TriviaQuestion(db.Model):
+    # Buffered opentdb questions waiting to be served, see trivia_pool.py
+    id = db.Column(db.Integer, primary_key=True)
+    question = db.Column(db.Text, nullable=False)
+    correct_answer = db.Column(db.Text, nullable=False)
+    incorrect_answers = db.Column(db.Text, nullable=False)  # JSON list
+    category = db.Column(db.String(100), nullable=True)
+    difficulty = db.Column(db.String(20), nullable=True)
+    question_hash = db.Column(db.String(40), unique=True, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "question": self.question,
+            "correct_answer": self.correct_answer,
+            "incorrect_answers": json.loads(self.incorrect_answers),
+            "category": self.category,
+        }
 
 
 class TriviaStreak(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
     current_streak = db.Column(db.Integer, default=0)
-    max_streak = db.Column(db.Integer, default=0)
+    max_streak = db.Column(db.Integer, default=0, index=True)
     daily_count = db.Column(db.Integer, default=0)
     last_played = db.Column(db.DateTime, default=datetime.now)
 
@@ -116,3 +200,61 @@ class UserConverterUnlock(db.Model):
     converter_type = db.Column(db.String(50), nullable=False)
 
     __table_args__ = (db.UniqueConstraint('user_id', 'converter_type', name='_user_converter_uc'),)
+
+
+class ExchangeRateSnapshot(db.Model):
+    # Last good rate table per base currency, served while the exchange rate API is down
+    id = db.Column(db.Integer, primary_key=True)
+    base = db.Column(db.String(3), unique=True, nullable=False)
+    rates = db.Column(db.Text, nullable=False)  # JSON {currency: rate}
+    fetched_at = db.Column(db.DateTime, nullable=False)
+
+
+class CatFact(db.Model):
+    # Cat facts served by /cat, crawled from catfact.ninja or added by users (see cat_facts.py)
+    id = db.Column(db.Integer, primary_key=True)
+    fact = db.Column(db.Text, nullable=False)
+    fact_hash = db.Column(db.String(40), unique=True, nullable=False)
+    source = db.Column(db.String(20), nullable=False, default='catfact')  # 'catfact' or 'user'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    user = db.relationship('User', backref='cat_facts')
+
+
+class SeedRun(db.Model):
+    # Versions of the seed data (seed.py) that have been applied to this database
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    applied_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+
+class JobLease(db.Model):
+    # Which process may run a scheduled job right now, see job_lease.py
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(200), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class JobRun(db.Model):
+    # One row per scheduled job run: who ran it, how long it took and how it ended
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(100), nullable=False)
+    owner = db.Column(db.String(200), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # running / success / error / lost
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (db.Index('ix_job_run_job_started', 'job', 'started_at'),)
+
+
+class PointsLedger(db.Model):
+    # Every change to a user's points, written by points.py in the same transaction as the change
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    delta = db.Column(db.Integer, nullable=False)  # negative when points were spent
+    reason = db.Column(db.String(50), nullable=False)
+    balance_after = db.Column(db.Integer, nullable=True)  # empty on databases without UPDATE ... RETURNING
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    # Audits and "earned this week" are always one user over a time range
+    __table_args__ = (db.Index('ix_points_ledger_user_created', 'user_id', 'created_at'),)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+from extensions import db
+from models import User, PointsLedger
+
+# Every change to a user's points goes through here. The balance check and the change are one
+# conditional UPDATE, so two requests spending at once can't both pass the check, and no SELECT
+# is needed beforehand. Each change also adds a points_ledger row.
+# Nothing is committed here, callers commit together with whatever the points paid for.
+
+
+def _update_counter(user, column, delta, minimum=None):
+    # column = column + delta for this user, only if it's at least minimum right now.
+    # Returns (changed, new value), the value is None on databases without UPDATE ... RETURNING
+    current = func.coalesce(column, 0)
+    stmt = update(User).where(User.id == user.id).values({column: current + delta})
+    if minimum is not None:
+        stmt = stmt.where(current >= minimum)
+
+    # Postgres and SQLite hand the new value back with the UPDATE, elsewhere it's reloaded on next access
+    returning = db.session.get_bind().dialect.update_returning
+    if returning:
+        stmt = stmt.returning(column)
+    result = db.session.execute(stmt, execution_options={'synchronize_session': False})
+
+    if returning:
+        row = result.first()
+        if row is None:
+            return False, None
+        set_committed_value(user, column.key, row[0])
+        return True, row[0]
+    if result.rowcount == 0:
+        return False, None
+    db.session.expire(user, [column.key])
+    return True, None
+
+
+def _apply(user, delta, reason, minimum=None):
+    changed, balance_after = _update_counter(user, User.points, delta, minimum)
+    if not changed:
+        return False
+    db.session.add(PointsLedger(user_id=user.id, delta=delta, reason=reason, balance_after=balance_after))
+    return True
+
+
+def spend_points(user, amount, reason):
+    # False (and nothing changed) when the user has less than amount
+    return _apply(user, -amount, reason, minimum=amount)
+
+
+def has_points(user, minimum=1):
+    # Balance gate for features that need points to use but don't spend them. It's the same conditional
+    # UPDATE with a delta of 0, so the check reads the committed balance and holds the row until the
+    # caller's transaction ends instead of trusting a value loaded earlier in the request
+    changed, _ = _update_counter(user, User.points, 0, minimum=minimum)
+    return changed
+
+
+def award_points(user, amount, reason):
+    if amount <= 0:
+        return
+    _apply(user, amount, reason)
+
+
+# Trivia freezers are a counter on the user row as well, changed the same way (no ledger, they aren't points)
+def add_trivia_freezer(user):
+    _update_counter(user, User.trivia_freezers, 1)
+
+
+def use_trivia_freezer(user):
+    # False when the user has none left
+    changed, _ = _update_counter(user, User.trivia_freezers, -1, minimum=1)
+    return changed
+
+
+def points_earned_since(user_id, since):
+    total = db.session.query(func.sum(PointsLedger.delta)).filter(
+        PointsLedger.user_id == user_id,
+        PointsLedger.created_at >= since,
+        PointsLedger.delta > 0
+    ).scalar()
+    return total or 0
+
+
+def points_earned_this_week(user_id):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return points_earned_since(user_id, today - timedelta(days=today.weekday()))
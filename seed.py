@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import insert, literal, select
+
+from extensions import db
+from models import Feature, SeedRun, TriviaStreak, User
+
+# Bump when FEATURES (or anything else below) changes so `flask seed` applies it again
+SEED_VERSION = 1
+
+FEATURES = [
+    {"name": "Update Task", "description": "Unlock the ability to update task names.", "cost": 100, "key": "update_task"},
+    {"name": "Tags", "description": "You can add tags to your tasks.", "cost": 250, "key": "add_tags"},
+    {"name": "Task Reminder", "description": "Sends you emails to remind you of tasks.", "cost": 500, "key": "task_reminder"},
+    {"name": "Blog", "description": "You can now talk to people!", "cost": 100, "key": "blog"},
+    {"name": "Dark Mode", "description": "You can now use Dark Mode in dashboard!", "cost": 50, "key": "dark_mode"},
+    {"name": "Trivia Freezer", "description": "Protects your trivia streak from breaking once.", "cost": 100, "key": "trivia_freezer"},
+]
+
+
+def applied_version():
+    return db.session.query(db.func.max(SeedRun.version)).scalar() or 0
+
+
+def seed_features():
+    # Upsert by key: one query for the features already there, their name/description/cost are brought
+    # in line with FEATURES, and one bulk insert for the rest. Ids never change, owned features stay owned
+    existing = {f.key: f for f in Feature.query.filter(Feature.key.in_([f["key"] for f in FEATURES]))}
+    missing = [f for f in FEATURES if f["key"] not in existing]
+    if missing:
+        db.session.execute(insert(Feature), missing)
+
+    updated = 0
+    for f in FEATURES:
+        feature = existing.get(f["key"])
+        if feature is None:
+            continue
+        changed = False
+        for field in ("name", "description", "cost"):
+            if getattr(feature, field) != f[field]:
+                setattr(feature, field, f[field])
+                changed = True
+        updated += changed
+    return len(missing), updated
+
+
+def seed_trivia_streaks():
+    # INSERT ... SELECT a zeroed streak for every user that has none, existing streaks are left alone
+    users_without_streak = select(
+        User.id, literal(0), literal(0), literal(0), literal(datetime.now())
+    ).where(~select(TriviaStreak.id).where(TriviaStreak.user_id == User.id).exists())
+    result = db.session.execute(insert(TriviaStreak).from_select(
+        ["user_id", "current_streak", "max_streak", "daily_count", "last_played"], users_without_streak
+    ))
+    return result.rowcount
+
+
+def run_seed(force=False):
+    # Safe to run any number of times; does nothing once SEED_VERSION is recorded unless forced
+    if not force and applied_version() >= SEED_VERSION:
+        return None
+    added, updated = seed_features()
+    counts = {"features": added, "features_updated": updated, "trivia_streaks": seed_trivia_streaks()}
+    if not db.session.get(SeedRun, SEED_VERSION):
+        db.session.add(SeedRun(version=SEED_VERSION))
+    db.session.commit()
+    return counts
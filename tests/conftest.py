@@ -0,0 +1,17 @@
+import pytest
+from flask import Flask
+
+from extensions import db
+import models  # noqa: F401, registers the tables with db
+
+
+# A bare Flask app on a throwaway SQLite file, so model and points tests don't need config.py or app.py
+@pytest.fixture
+def db_app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
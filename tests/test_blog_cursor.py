@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Messages, User
+
+# The cursor helpers live in app.py, which needs config.py like the app itself
+pytest.importorskip("config", reason="app.py needs config.py")
+from app import decode_cursor, encode_cursor, load_blog_page, paginate_by_cursor  # noqa: E402
+
+START = datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def messages(db_app):
+    user = User(username='writer')
+    db.session.add(user)
+    db.session.flush()
+    # Groups of rows share a timestamp, so the id tie-break matters
+    rows = [Messages(content=f'post {i}', user_id=user.id, timestamp=START + timedelta(minutes=i // 4)) for i in range(45)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def test_cursor_round_trip(messages):
+    row = messages[7]
+    assert decode_cursor(encode_cursor(row)) == (row.timestamp, row.id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'garbage', '2025-01-01T12:00:00', '2025-01-01T12:00:00_x', 'nope_5', None])
+def test_bad_cursors_decode_to_none(cursor):
+    assert decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize('limit', [1, 4, 7, 20, 45, 100])
+def test_pages_cover_every_row_once_newest_first(messages, limit):
+    expected = [m.id for m in sorted(messages, key=lambda m: (m.timestamp, m.id), reverse=True)]
+    seen, cursor = [], None
+    while True:
+        rows, cursor = paginate_by_cursor(Messages.query, Messages, cursor, limit)
+        assert len(rows) <= limit
+        seen += [row.id for row in rows]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_rows_added_while_paging_do_not_shift_pages(messages):
+    rows, cursor = paginate_by_cursor(Messages.query, Messages, None, 10)
+    # A new post lands at the top, the next page still starts right after the last row shown
+    db.session.add(Messages(content='new', user_id=messages[0].user_id, timestamp=START + timedelta(days=1)))
+    db.session.commit()
+    next_rows, _ = paginate_by_cursor(Messages.query, Messages, cursor, 10)
+    assert next_rows[0].id not in {row.id for row in rows}
+    assert (next_rows[0].timestamp, next_rows[0].id) < (rows[-1].timestamp, rows[-1].id)
+
+
+def test_bad_cursor_starts_from_the_top(messages):
+    first, _ = paginate_by_cursor(Messages.query, Messages, None, 5)
+    again, _ = paginate_by_cursor(Messages.query, Messages, 'garbage', 5)
+    assert [row.id for row in again] == [row.id for row in first]
+
+
+def test_last_full_page_has_no_next_cursor(messages):
+    rows, cursor = paginate_by_cursor(Messages.query, Messages, None, len(messages))
+    assert len(rows) == len(messages) and cursor is None
+
+
+def test_load_blog_page_is_two_queries(messages):
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        rows, _ = load_blog_page(limit=20)
+        for row in rows:
+            row.user.username
+            row.comments
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert len(statements) == 2
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+
+import pytest
+
+import tools.csv_stream as csv_stream
+from tools.csv_stream import StreamConversionError, iter_json_array_records, stream_conversion
+from tools.json_stream import read_text_chunks
+
+RECORDS = [
+    {"id": 1, "name": "Ann", "tags": ["a", "b"]},
+    {"id": 2, "name": "Bob, Jr.", "note": "line\nbreak"},
+    {"id": 3, "name": None},
+]
+
+
+class OneWayStream(io.RawIOBase):
+    # An upload that can only be read once, like a chunked request body
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(buffer)
+
+
+def convert(data, from_format, to_format, seekable=True):
+    stream = io.BytesIO(data) if seekable else io.BufferedReader(OneWayStream(data))
+    return ''.join(stream_conversion(stream, from_format, to_format))
+
+
+@pytest.mark.parametrize('seekable', [True, False])
+def test_json_to_csv_uses_every_key_in_first_seen_order(seekable):
+    out = convert(json.dumps(RECORDS).encode(), 'json', 'csv', seekable)
+    rows = list(csv.DictReader(io.StringIO(out)))
+    assert list(rows[0]) == ["id", "name", "tags", "note"]
+    assert rows[0]["tags"] == '["a", "b"]'
+    assert rows[1]["name"] == "Bob, Jr." and rows[1]["note"] == "line\nbreak"
+    assert rows[2]["name"] == "" and rows[2]["note"] == ""
+
+
+def test_sampled_header_leaves_out_keys_after_the_sample(monkeypatch):
+    monkeypatch.setattr(csv_stream, 'SAMPLE_SIZE', 1)
+    out = convert(json.dumps(RECORDS).encode(), 'json', 'csv', seekable=False)
+    assert out.splitlines()[0] == "id,name,tags"
+
+
+@pytest.mark.parametrize('from_format, to_format', sorted(csv_stream.STREAMABLE_PAIRS))
+def test_round_trip_through_every_pair(from_format, to_format):
+    flat = [{"id": str(i), "name": f"row {i}"} for i in range(5)]
+    source = {
+        'csv': 'id,name\n' + ''.join(f'{r["id"]},{r["name"]}\n' for r in flat),
+        'json': json.dumps(flat),
+        'jsonl': ''.join(json.dumps(r) + '\n' for r in flat),
+    }[from_format]
+    out = convert(source.encode(), from_format, to_format)
+    back = list(csv_stream.READERS[to_format](io.BytesIO(out.encode())))
+    assert back == flat
+
+
+def test_json_array_output_is_valid_json(monkeypatch):
+    # Small flushes so the array is put together from several pieces
+    monkeypatch.setattr(csv_stream, 'FLUSH_SIZE', 10)
+    records = [{"n": i} for i in range(50)]
+    out = convert(''.join(json.dumps(r) + '\n' for r in records).encode(), 'jsonl', 'json')
+    assert json.loads(out) == records
+    assert convert(b'', 'jsonl', 'json') == '[]\n'
+
+
+def test_json_array_reader_across_chunk_boundaries(monkeypatch):
+    # 1 character chunks, so numbers, strings and separators are all split
+    monkeypatch.setattr(csv_stream, 'read_text_chunks', lambda stream: read_text_chunks(stream, chunk_size=1))
+    records = [{"a": 12345, "b": "x y"}, [1, 2], 3.5, "s", None]
+    stream = io.BytesIO(json.dumps(records).encode())
+    assert list(iter_json_array_records(stream)) == records
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}', '  {"a": 1}  '])
+def test_single_object_is_one_record(text):
+    assert list(iter_json_array_records(io.BytesIO(text.encode()))) == [{"a": 1}]
+
+
+@pytest.mark.parametrize('text, message', [
+    ('"string"', "Expected a JSON array"),
+    ('[1, 2', "Unexpected end of JSON"),
+    ('[1 2]', "Unexpected '2'"),
+    ('[1] [2]', "Extra data"),
+    ('[{"a": }]', "Invalid JSON"),
+])
+def test_json_array_reader_errors(text, message):
+    with pytest.raises(StreamConversionError, match=message):
+        list(iter_json_array_records(io.BytesIO(text.encode())))
+
+
+def test_bad_input_fails_before_any_output():
+    # Line 3 is broken, the first pass finds it before the generator is handed out
+    data = b'{"a": 1}\n{"a": 2}\n{nope}\n'
+    with pytest.raises(StreamConversionError, match="line 3"):
+        stream_conversion(io.BytesIO(data), 'jsonl', 'csv')
+
+
+def test_csv_needs_objects():
+    with pytest.raises(StreamConversionError):
+        convert(b'[1, 2]', 'json', 'csv')
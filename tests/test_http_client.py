@@ -0,0 +1,195 @@
+import pytest
+import requests
+
+import http_client
+from http_client import CircuitBreaker, CircuitOpen, HttpClient
+
+URL = 'https://api.example.com/thing'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(http_client.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(http_client.time, 'sleep', clock.sleep)
+    return clock
+
+
+def response(status, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r.headers.update(headers or {})
+    return r
+
+
+@pytest.fixture
+def client(monkeypatch, clock):
+    # session.request answers with whatever is queued in client.answers, exceptions are raised
+    client = HttpClient()
+    client.answers = []
+    client.calls = []
+
+    def fake_request(method, url, **kwargs):
+        client.calls.append((method, kwargs.get('timeout')))
+        answer = client.answers.pop(0)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(client.session, 'request', fake_request)
+    return client
+
+
+# --- CircuitBreaker ---
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(threshold=3, open_seconds=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.failure()
+    assert not breaker.is_open
+    breaker.failure()
+    assert breaker.is_open and not breaker.allow()
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(threshold=3)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert not breaker.is_open
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=1, open_seconds=30)
+    breaker.failure()
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+    # Only one trial at a time
+    assert not breaker.allow()
+    breaker.success()
+    assert not breaker.is_open and breaker.allow()
+
+
+def test_failed_trial_opens_the_breaker_again(clock):
+    breaker = CircuitBreaker(threshold=1, open_seconds=30)
+    breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_released_trial_can_be_taken_again(clock):
+    breaker = CircuitBreaker(threshold=1, open_seconds=30)
+    breaker.failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.is_open
+    assert breaker.allow()
+
+
+# --- HttpClient ---
+def test_fails_fast_once_the_host_is_failing(client):
+    client.answers = [requests.exceptions.ConnectionError()] * http_client.FAILURE_THRESHOLD
+    for _ in range(http_client.FAILURE_THRESHOLD):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.get(URL, retries=0)
+    with pytest.raises(CircuitOpen):
+        client.get(URL)
+    assert len(client.calls) == http_client.FAILURE_THRESHOLD
+    # Existing `except RequestException` handlers cover it
+    assert issubclass(CircuitOpen, requests.exceptions.RequestException)
+
+
+def test_breakers_are_per_host(client):
+    client.breaker('api.example.com').opened_at = http_client.time.monotonic()
+    client.answers = [response(200)]
+    assert client.get('https://other.example.com/').status_code == 200
+
+
+def test_get_retries_5xx_then_returns_the_last_response(client):
+    client.answers = [response(503), response(503), response(503)]
+    assert client.get(URL).status_code == 503
+    assert len(client.calls) == 1 + http_client.MAX_RETRIES
+
+
+def test_get_retry_succeeds(client):
+    client.answers = [response(502), response(200)]
+    assert client.get(URL).status_code == 200
+    assert not client.breaker('api.example.com').failures
+
+
+def test_post_is_not_retried_after_it_may_have_been_sent(client):
+    client.answers = [response(503)]
+    assert client.post(URL).status_code == 503
+    client.answers = [requests.exceptions.ReadTimeout()]
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.post(URL)
+    assert len(client.calls) == 2
+
+
+def test_post_is_retried_when_it_never_connected(client):
+    client.answers = [requests.exceptions.ConnectTimeout(), response(201)]
+    assert client.post(URL).status_code == 201
+
+
+def test_4xx_is_not_retried_and_counts_as_success(client):
+    client.answers = [response(404)]
+    assert client.get(URL).status_code == 404
+    assert len(client.calls) == 1
+    assert not client.breaker('api.example.com').failures
+
+
+def test_retry_after_is_respected_up_to_the_cap(client, clock):
+    client.answers = [response(429, {'Retry-After': '1'}), response(429, {'Retry-After': '60'}), response(200)]
+    assert client.get(URL).status_code == 200
+    assert clock.slept[0] >= 1
+    assert clock.slept[1] <= http_client.BACKOFF_MAX
+
+
+def test_unexpected_error_gives_the_trial_back(client, clock):
+    breaker = client.breaker('api.example.com')
+    breaker.failures = breaker.threshold
+    breaker.opened_at = clock.now - breaker.open_seconds
+    client.answers = [TypeError('bad argument')]
+    with pytest.raises(TypeError):
+        client.get(URL)
+    assert breaker.allow()
+
+
+def test_passed_deadline_does_not_call_or_take_the_trial(client, clock):
+    breaker = client.breaker('api.example.com')
+    breaker.failures = breaker.threshold
+    breaker.opened_at = clock.now - breaker.open_seconds
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get(URL, deadline=clock.now)
+    assert client.calls == []
+    assert breaker.allow()
+
+
+def test_deadline_shortens_the_timeout_and_stops_retries(client, clock):
+    client.answers = [response(503), response(503), response(503)]
+    result = client.get(URL, timeout=(3, 10), deadline=clock.now + 0.001)
+    assert result.status_code == 503
+    assert client.calls[0][1] == pytest.approx((0.001, 0.001))
+    assert len(client.calls) == 1
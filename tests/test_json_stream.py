@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+from tools.json_stream import JSONReformatter, JSONStreamError, read_text_chunks, reformat_stream, validate_stream
+
+DOCUMENTS = [
+    {"a": 1, "b": [1, 2.5, -3e10, True, False, None], "c": {"d": "e", "empty": {}, "none": []}},
+    [{"name": "café \"quoted\" \\ back\nslash", "n": -0.0}, [], [[[]]], "☃"],
+    "just a string",
+    12345,
+    [],
+    {},
+]
+
+
+def feed_in_pieces(text, size, indent=4):
+    formatter = JSONReformatter(indent=indent)
+    out = [formatter.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    out.append(formatter.close())
+    return ''.join(out)
+
+
+@pytest.mark.parametrize('doc', DOCUMENTS)
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+def test_matches_json_dumps_for_any_chunking(doc, size):
+    # Chunk boundaries land inside strings, escapes, numbers and literals
+    text = json.dumps(doc)
+    assert feed_in_pieces(text, size) == json.dumps(doc, indent=4)
+    assert feed_in_pieces(text, size, indent=2) == json.dumps(doc, indent=2)
+    assert feed_in_pieces(text, size, indent=None) == json.dumps(doc, separators=(',', ':'))
+
+
+def test_unicode_escape_split_across_chunks():
+    text = '["\\u00e9\\n"]'
+    for split in range(1, len(text)):
+        formatter = JSONReformatter(indent=None)
+        assert formatter.feed(text[:split]) + formatter.feed(text[split:]) + formatter.close() == text
+
+
+def test_number_at_end_of_chunk_waits_for_the_rest():
+    formatter = JSONReformatter(indent=None)
+    assert formatter.feed('[12') == '['
+    assert formatter.feed('34]') + formatter.close() == '1234]'
+
+
+def test_read_text_chunks_handles_bom_and_split_characters():
+    # The snowman is 3 bytes, 1 byte chunks split it
+    data = '\ufeff{"s": "☃"}'.encode('utf-8')
+    assert ''.join(read_text_chunks(io.BytesIO(data), chunk_size=1)) == '{"s": "☃"}'
+    assert ''.join(reformat_stream(io.BytesIO(data), indent=None)) == '{"s":"☃"}'
+
+
+@pytest.mark.parametrize('text, position', [
+    ('{"a" 1}', 5),
+    ('[1,]', 3),
+    ('[1 2]', 3),
+    ('{"a": tru}', 6),
+    ('[01]', 1),
+    ('["bad \\x"]', 6),
+    ('["tab\there"]', 5),
+    ('{"a": 1]', 7),
+    (']', 0),
+])
+def test_errors_report_the_position(text, position):
+    formatter = JSONReformatter()
+    with pytest.raises(JSONStreamError) as exc:
+        formatter.feed(text)
+        formatter.close()
+    assert exc.value.position == position
+
+
+@pytest.mark.parametrize('text', ['', '[1, 2', '{"a": ', '"open', '1 2'])
+def test_incomplete_documents_are_rejected(text):
+    with pytest.raises(JSONStreamError):
+        validate_stream(io.BytesIO(text.encode('utf-8')))
+
+
+def test_validate_stream_accepts_valid_json():
+    validate_stream(io.BytesIO(json.dumps(DOCUMENTS).encode('utf-8')))
+
+
+def test_invalid_utf8_is_rejected():
+    with pytest.raises(UnicodeDecodeError):
+        validate_stream(io.BytesIO(b'["\xff"]'))
@@ -0,0 +1,129 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from models import PointsLedger, User
+from points import (add_trivia_freezer, award_points, has_points, points_earned_since, spend_points,
+                    use_trivia_freezer)
+
+
+def make_user(points=0, freezers=0):
+    user = User(username=f'user{User.query.count()}', points=points, trivia_freezers=freezers)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def stored_points(user):
+    return db.session.execute(text('SELECT points FROM user WHERE id = :id'), {'id': user.id}).scalar()
+
+
+def test_spend_with_enough_points(db_app):
+    user = make_user(10)
+    assert spend_points(user, 4, 'test')
+    db.session.commit()
+    assert user.points == 6 and stored_points(user) == 6
+    entry = PointsLedger.query.one()
+    assert (entry.delta, entry.reason, entry.balance_after) == (-4, 'test', 6)
+
+
+def test_spend_down_to_zero(db_app):
+    user = make_user(3)
+    assert spend_points(user, 3, 'test')
+    db.session.commit()
+    assert stored_points(user) == 0
+
+
+def test_spend_without_enough_points_changes_nothing(db_app):
+    user = make_user(3)
+    assert not spend_points(user, 4, 'test')
+    db.session.commit()
+    assert stored_points(user) == 3
+    assert PointsLedger.query.count() == 0
+
+
+def test_check_uses_the_stored_balance_not_the_loaded_one(db_app):
+    user = make_user(5)
+    # Another request spent the points after this one loaded the user
+    db.session.execute(text('UPDATE user SET points = 0 WHERE id = :id'), {'id': user.id})
+    assert user.points == 5
+    assert not spend_points(user, 1, 'test')
+    assert not has_points(user)
+
+
+def test_null_points_count_as_zero(db_app):
+    user = make_user()
+    db.session.execute(text('UPDATE user SET points = NULL WHERE id = :id'), {'id': user.id})
+    assert not spend_points(user, 1, 'test')
+    award_points(user, 5, 'test')
+    db.session.commit()
+    assert stored_points(user) == 5
+
+
+@pytest.mark.parametrize('points, expected', [(0, False), (1, True), (50, True)])
+def test_has_points_changes_nothing(db_app, points, expected):
+    user = make_user(points)
+    assert has_points(user) is expected
+    db.session.commit()
+    assert stored_points(user) == points
+    assert PointsLedger.query.count() == 0
+
+
+def test_award_ignores_zero_and_negative(db_app):
+    user = make_user(2)
+    award_points(user, 0, 'test')
+    award_points(user, -5, 'test')
+    award_points(user, 3, 'test')
+    db.session.commit()
+    assert stored_points(user) == 5
+    assert [e.delta for e in PointsLedger.query] == [3]
+
+
+def test_freezers(db_app):
+    user = make_user()
+    assert not use_trivia_freezer(user)
+    add_trivia_freezer(user)
+    add_trivia_freezer(user)
+    assert use_trivia_freezer(user)
+    db.session.commit()
+    assert user.trivia_freezers == 1
+    assert use_trivia_freezer(user)
+    assert not use_trivia_freezer(user)
+
+
+def test_points_earned_since_only_counts_awards(db_app):
+    user = make_user(10)
+    award_points(user, 4, 'a')
+    spend_points(user, 3, 'b')
+    award_points(user, 2, 'c')
+    db.session.add(PointsLedger(user_id=user.id, delta=100, reason='old', balance_after=0,
+                                created_at=datetime.now() - timedelta(days=30)))
+    db.session.commit()
+    assert points_earned_since(user.id, datetime.now() - timedelta(days=1)) == 6
+
+
+def test_concurrent_spends_never_overdraw(db_app):
+    user_id = make_user(5).id
+    results = []
+    start = threading.Barrier(10)
+
+    def spend():
+        with db_app.app_context():
+            user = db.session.get(User, user_id)
+            start.wait()
+            ok = spend_points(user, 1, 'race')
+            db.session.commit()
+            results.append(ok)
+
+    threads = [threading.Thread(target=spend) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 5
+    assert db.session.get(User, user_id).points == 0
+    assert PointsLedger.query.count() == 5
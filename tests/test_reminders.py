@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import REMINDER_WINDOW, Task
+
+NOW = datetime(2025, 3, 10, 9, 0)
+POLL = timedelta(minutes=5)
+
+
+def task_due_in(delta, **flags):
+    task = Task(task='t', due_date=NOW + delta, completed=False)
+    for days, sent in flags.items():
+        setattr(task, f'reminder_sent_{days[1:]}', sent)
+    return task
+
+
+def poll(task, now, enabled=True):
+    # What send_reminders does with a task whose next_reminder_at has come
+    days = task.due_reminder(now) if enabled and not task.completed and task.due_date else None
+    if days:
+        task.mark_reminder_sent(days)
+    task.schedule_next_reminder(enabled, now)
+    return days
+
+
+def run_polls(task, start, until):
+    # Polls every 5 minutes like the scheduler, returns (time, days) for every email sent
+    sent = []
+    task.schedule_next_reminder(True, start)
+    now = start
+    while now < until:
+        if task.next_reminder_at is not None and task.next_reminder_at <= now:
+            days = poll(task, now)
+            if days:
+                sent.append((now, days))
+            # Handled tasks never stay due, otherwise send_reminders would pick them up again right away
+            assert task.next_reminder_at is None or task.next_reminder_at > now
+        now += POLL
+    return sent
+
+
+def test_far_task_waits_for_the_7_day_reminder():
+    task = task_due_in(timedelta(days=10))
+    task.schedule_next_reminder(True, NOW)
+    assert task.next_reminder_at == task.due_date - timedelta(days=7)
+    assert task.due_reminder(NOW) is None
+
+
+def test_every_reminder_goes_out_once_at_its_time():
+    task = task_due_in(timedelta(days=10))
+    sent = run_polls(task, NOW, task.due_date)
+    assert [days for _, days in sent] == [7, 3, 1]
+    for when, days in sent:
+        starts = task.due_date - timedelta(days=days)
+        assert starts <= when < starts + POLL
+    assert task.next_reminder_at is None
+
+
+def test_task_added_late_skips_the_reminders_it_missed():
+    # Due in 5 days: a "due in 7 days" email would be wrong
+    task = task_due_in(timedelta(days=5))
+    sent = run_polls(task, NOW, task.due_date)
+    assert [days for _, days in sent] == [3, 1]
+    assert task.reminder_sent_7
+
+
+def test_open_window_sends_right_away():
+    task = task_due_in(timedelta(days=6, hours=12))
+    task.schedule_next_reminder(True, NOW)
+    assert task.next_reminder_at <= NOW
+    assert poll(task, NOW) == 7
+    assert task.next_reminder_at == task.due_date - timedelta(days=3)
+
+
+def test_reminder_window_closes():
+    task = task_due_in(timedelta(days=7))
+    later = NOW + REMINDER_WINDOW
+    assert task.due_reminder(NOW) == 7
+    assert task.due_reminder(later) is None
+    task.schedule_next_reminder(True, later)
+    assert task.reminder_sent_7
+    assert task.next_reminder_at == task.due_date - timedelta(days=3)
+
+
+def test_due_within_a_day_only_gets_the_1_day_reminder():
+    task = task_due_in(timedelta(hours=12))
+    assert poll(task, NOW) == 1
+    assert task.reminder_sent_7 and task.reminder_sent_3 and task.reminder_sent_1
+    assert task.next_reminder_at is None
+
+
+def test_overdue_task_gets_nothing():
+    task = task_due_in(timedelta(days=-2))
+    task.schedule_next_reminder(True, NOW)
+    assert task.next_reminder_at is None
+    assert task.due_reminder(NOW) is None
+
+
+def test_mark_sent_covers_earlier_reminders():
+    task = task_due_in(timedelta(days=2))
+    task.mark_reminder_sent(3)
+    assert task.reminder_sent_7 and task.reminder_sent_3 and not task.reminder_sent_1
+
+
+def test_flags_before_a_later_sent_one_do_not_reopen():
+    # Older rows can have the 1 day flag set and the others not, nothing is left to send for them
+    task = task_due_in(timedelta(days=10), r1=True)
+    task.schedule_next_reminder(True, NOW)
+    assert task.next_reminder_at is None
+    assert task.due_reminder(NOW + timedelta(days=3)) is None
+
+
+@pytest.mark.parametrize('change', [
+    lambda task: setattr(task, 'completed', True),
+    lambda task: setattr(task, 'due_date', None),
+])
+def test_finished_or_undated_tasks_are_not_scheduled(change):
+    task = task_due_in(timedelta(days=10))
+    change(task)
+    task.schedule_next_reminder(True, NOW)
+    assert task.next_reminder_at is None
+
+
+def test_disabled_reminders_clear_the_schedule():
+    task = task_due_in(timedelta(days=10))
+    task.schedule_next_reminder(True, NOW)
+    task.schedule_next_reminder(False, NOW)
+    assert task.next_reminder_at is None
+    assert poll(task, task.due_date - timedelta(days=7), enabled=False) is None
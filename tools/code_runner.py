@@ -0,0 +1,199 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+import requests
+
+from cache import TTLCache
+from http_client import upstream, CircuitOpen
+
+PISTON_URL = os.getenv("PISTON_URL", "https://emkc.org/api/v2/piston/execute")
+# "piston" sends everything to PISTON_URL, "local" runs Python here (tools/local_runner.py) and the rest on Piston
+CODE_BACKEND = os.getenv("CODE_BACKEND", "piston")
+# (connect, read) seconds for one execution
+PISTON_TIMEOUT = (3, 20)
+# Executions running at the same time, everything else waits in the queue
+MAX_CONCURRENT = 4
+MAX_QUEUED = 100
+MAX_QUEUED_PER_USER = 3
+# How long the plain (non async) /run_code request waits for its job
+WAIT_TIMEOUT = 30
+RESULT_TTL = 10 * 60
+JOB_TTL = 10 * 60
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'error'
+
+
+class RunnerBusy(Exception):
+    pass
+
+
+class ExecutionError(Exception):
+    pass
+
+
+class PistonBackend:
+    def __init__(self, url=PISTON_URL):
+        self.url = url
+
+    def execute(self, payload):
+        # Only retried when the connection never opened, a run that reached Piston isn't sent twice
+        try:
+            response = upstream.post(self.url, json=payload, timeout=PISTON_TIMEOUT)
+            if response.status_code == 400:
+                # Unknown language and the like, Piston explains in "message"
+                raise ExecutionError(response.json().get("message", "Code execution was rejected"))
+            response.raise_for_status()
+            return response.json()
+        except CircuitOpen:
+            raise ExecutionError("Code execution service is unavailable right now, try again in a bit")
+        except requests.Timeout:
+            raise ExecutionError("Code execution timed out")
+        except (requests.RequestException, ValueError) as e:
+            raise ExecutionError(f"Code execution service error: {str(e)}")
+
+
+def build_payload(language, code, stdin='', version='*'):
+    return {
+        "language": language,
+        "version": version,
+        "files": [{"name": "main", "content": code}],
+        "stdin": stdin
+    }
+
+
+def cache_key(payload):
+    code_hash = hashlib.sha256(payload["files"][0]["content"].encode()).hexdigest()
+    return (payload["language"], payload["version"], code_hash, payload["stdin"])
+
+
+class Job:
+    def __init__(self, user_id, payload):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.payload = payload
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cached = False
+        self.created_at = time.time()
+        self.done = threading.Event()
+
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.status = FAILED if error else DONE
+        self.done.set()
+
+    def to_dict(self):
+        data = {'job_id': self.id, 'status': self.status, 'cached': self.cached}
+        if self.status == DONE:
+            run = self.result.get("run", {})
+            data['output'] = run.get("stdout", "")
+            data['error'] = run.get("stderr", "") or self.result.get("compile", {}).get("stderr", "")
+        elif self.status == FAILED:
+            data['error'] = self.error
+        return data
+
+
+# Runs code through a backend with a fixed number of runner threads. Each user has their own queue and
+# the runners take jobs from users in turn, so one user sending a burst can't push everyone else back.
+# Jobs and results are kept in this process only, another worker or serverless instance can't see them.
+class CodeRunner:
+    def __init__(self, backend, concurrency=MAX_CONCURRENT):
+        self.backend = backend
+        self.concurrency = concurrency
+        self.results = TTLCache(RESULT_TTL, maxsize=500)
+        self.jobs = TTLCache(JOB_TTL, maxsize=5000)
+        self._queues = OrderedDict()  # user_id -> deque of jobs, in turn order
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _start(self):
+        # Runner threads are started with the first job
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._work, name=f'code-runner-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, user_id, language, code, stdin='', version='*', use_cache=True):
+        payload = build_payload(language, code, stdin, version)
+        job = Job(user_id, payload)
+
+        # Same code and input gives the same output, unless the user asks for a fresh run
+        cached = self.results.get(cache_key(payload)) if use_cache else None
+        if cached is not None:
+            job.cached = True
+            job.finish(result=cached)
+            self.jobs.set(job.id, job)
+            return job
+
+        if not self._threads:
+            self._start()
+        with self._cond:
+            user_queue = self._queues.get(user_id)
+            if user_queue is not None and len(user_queue) >= MAX_QUEUED_PER_USER:
+                raise RunnerBusy("You already have code waiting to run, please wait for it to finish.")
+            if self._queued >= MAX_QUEUED:
+                raise RunnerBusy("Code runner is busy, try again in a moment.")
+            if user_queue is None:
+                user_queue = self._queues[user_id] = deque()
+            user_queue.append(job)
+            self._queued += 1
+            self._cond.notify()
+        self.jobs.set(job.id, job)
+        return job
+
+    def run(self, user_id, language, code, stdin='', version='*', use_cache=True, timeout=WAIT_TIMEOUT):
+        job = self.submit(user_id, language, code, stdin, version, use_cache)
+        job.done.wait(timeout)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def _next_job(self):
+        with self._cond:
+            while not self._queues:
+                self._cond.wait()
+            # Take from the user whose turn it is, then send them to the back of the line
+            user_id, user_queue = self._queues.popitem(last=False)
+            job = user_queue.popleft()
+            if user_queue:
+                self._queues[user_id] = user_queue
+            self._queued -= 1
+            return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            job.status = RUNNING
+            try:
+                result = self.backend.execute(job.payload)
+            except ExecutionError as e:
+                job.finish(error=str(e))
+                continue
+            except Exception as e:
+                print(f"Code runner error: {e}")
+                job.finish(error="Code execution failed")
+                continue
+            self.results.set(cache_key(job.payload), result)
+            job.finish(result=result)
+
+
+def make_backend(name=CODE_BACKEND):
+    if name == "local":
+        # Imported here, local_runner itself imports this module
+        from tools.local_runner import LocalBackend
+        return LocalBackend(fallback=PistonBackend())
+    return PistonBackend()
+
+
+code_runner = CodeRunner(make_backend())
@@ -0,0 +1,199 @@
+import csv
+import io
+import json
+from itertools import chain, islice
+
+from tools.json_stream import read_text_chunks
+
+# Output is handed out in pieces of about this size
+FLUSH_SIZE = 64 * 1024
+# Rows looked at for the CSV header when the input can't be read twice
+SAMPLE_SIZE = 1000
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class StreamConversionError(ValueError):
+    pass
+
+
+# --- Readers: yield one record (dict) at a time ---
+def iter_csv_records(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    finally:
+        # Hand the upload back to werkzeug instead of closing it with the wrapper
+        text.detach()
+
+
+def iter_jsonl_records(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    try:
+        for line_no, line in enumerate(text, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise StreamConversionError(f"Invalid JSON on line {line_no}: {e}")
+    finally:
+        text.detach()
+
+
+def iter_json_array_records(stream):
+    # Elements of a top-level JSON array decoded one by one, only the current element is buffered
+    decoder = json.JSONDecoder()
+    chunks = read_text_chunks(stream)
+    buf, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + chunk, 0
+        return True
+
+    def next_char():
+        # Next non-whitespace character (reading more input if needed), None at the end
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return None
+
+    c = next_char()
+    if c == '{':
+        # A single object is treated as one record
+        try:
+            yield json.loads(buf[pos:] + ''.join(chunks))
+        except json.JSONDecodeError as e:
+            raise StreamConversionError(f"Invalid JSON: {e}")
+        return
+    if c != '[':
+        raise StreamConversionError("Expected a JSON array of objects")
+    pos += 1
+
+    if next_char() == ']':
+        pos += 1
+    else:
+        while True:
+            while True:
+                try:
+                    record, end = decoder.raw_decode(buf, pos)
+                    # Something other than more number has to follow the element, otherwise a number cut by
+                    # the chunk boundary ("3" of "3.5", "1" of "1e5") looks finished
+                    if eof or (end < len(buf) and buf[end] not in _NUMBER_CHARS):
+                        break
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise StreamConversionError(f"Invalid JSON: {e}")
+                fill()
+            yield record
+            pos = end
+
+            c = next_char()
+            if c == ',':
+                pos += 1
+                next_char()
+            elif c == ']':
+                pos += 1
+                break
+            else:
+                raise StreamConversionError("Unexpected end of JSON" if c is None else f"Unexpected '{c}' in JSON array")
+
+    if next_char() is not None:
+        raise StreamConversionError("Extra data after JSON array")
+
+
+# --- Writers: take records, yield text pieces ---
+def cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return '' if value is None else value
+
+
+def union_fieldnames(records):
+    # Every key seen, in first-seen order
+    fieldnames = {}
+    for record in records:
+        if not isinstance(record, dict):
+            raise StreamConversionError('CSV conversion supports list of objects/dicts.')
+        fieldnames.update(dict.fromkeys(record))
+    return list(fieldnames)
+
+
+def csv_chunks(records, fieldnames):
+    out = io.StringIO()
+    # Keys outside the header (only possible with a sampled header) are left out
+    writer = csv.DictWriter(out, fieldnames=fieldnames, restval='', extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        if not isinstance(record, dict):
+            raise StreamConversionError('CSV conversion supports list of objects/dicts.')
+        writer.writerow({key: cell(value) for key, value in record.items()})
+        if out.tell() >= FLUSH_SIZE:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+
+def jsonl_chunks(records):
+    lines, size = [], 0
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= FLUSH_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def json_array_chunks(records):
+    # One record per line, still a single valid JSON array
+    separator = '[\n'
+    for piece in jsonl_chunks(records):
+        if not piece:
+            continue
+        lines = piece.rstrip('\n').split('\n')
+        yield separator + ',\n'.join(lines)
+        separator = ',\n'
+    yield '[]\n' if separator == '[\n' else '\n]\n'
+
+
+READERS = {'csv': iter_csv_records, 'json': iter_json_array_records, 'jsonl': iter_jsonl_records}
+WRITERS = {'json': json_array_chunks, 'jsonl': jsonl_chunks}
+STREAMABLE_PAIRS = {(f, t) for f in READERS for t in READERS if f != t}
+
+
+def stream_conversion(stream, from_format, to_format):
+    # Runs the first pass right away (CSV header / validation) so bad input raises here, before
+    # anything is sent, then returns a generator that reads the input again and yields the output.
+    read = READERS[from_format]
+    if stream.seekable():
+        if to_format == 'csv':
+            fieldnames = union_fieldnames(read(stream))
+        else:
+            for _ in read(stream):
+                pass
+        stream.seek(0)
+        records = read(stream)
+    else:
+        records = read(stream)
+        if to_format == 'csv':
+            sample = list(islice(records, SAMPLE_SIZE))
+            fieldnames = union_fieldnames(sample)
+            records = chain(sample, records)
+
+    if to_format == 'csv':
+        return csv_chunks(records, fieldnames)
+    return WRITERS[to_format](records)
@@ -0,0 +1,168 @@
+import configparser
+import csv
+import io
+import json
+import re
+
+from tools.csv_stream import csv_chunks, jsonl_chunks, union_fieldnames
+
+# Faster backends are used when they're installed, the pure Python ones otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# yaml, xmltodict, dicttoxml and toml are imported inside the functions that use them,
+# most requests only ever touch JSON and shouldn't pay for loading the rest
+
+_INDENT = re.compile(r'^( +)', re.MULTILINE)
+
+
+class CodecError(ValueError):
+    # Data that parsed fine but can't be written in the target format, message is shown as is
+    pass
+
+
+class Codec:
+    def __init__(self, name, extensions, parse, emit):
+        self.name = name
+        self.extensions = extensions
+        self.parse = parse
+        self.emit = emit
+
+
+CODECS = {}
+
+
+def register(name, extensions, parse, emit):
+    CODECS[name] = Codec(name, extensions, parse, emit)
+    return CODECS[name]
+
+
+def get_codec(name):
+    return CODECS.get(name)
+
+
+def codec_for_filename(filename):
+    filename = filename.lower()
+    for codec in CODECS.values():
+        if filename.endswith(codec.extensions):
+            return codec
+    return None
+
+
+def convert(text, from_format, to_format):
+    return CODECS[to_format].emit(CODECS[from_format].parse(text))
+
+
+# --- JSON ---
+def parse_json(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # let the stdlib parser produce the error message people are used to
+    return json.loads(text)
+
+
+def emit_json(data, indent=4):
+    if orjson is not None:
+        try:
+            if indent is None:
+                return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+            out = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+            # orjson only indents by 2, JSON strings can't hold raw newlines so re-indenting lines is safe
+            return out if indent == 2 else _INDENT.sub(lambda m: ' ' * (len(m.group(1)) // 2 * indent), out)
+        except TypeError:
+            pass  # ints over 64 bits and other things orjson refuses
+    if indent is None:
+        return json.dumps(data, separators=(',', ':'))
+    return json.dumps(data, indent=indent)
+
+
+# --- YAML ---
+def parse_yaml(text):
+    import yaml
+    return yaml.load(text, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
+
+
+def emit_yaml(data):
+    import yaml
+    return yaml.dump(data, Dumper=getattr(yaml, 'CDumper', yaml.Dumper), sort_keys=False)
+
+
+# --- XML ---
+def parse_xml(text):
+    import xmltodict
+    return xmltodict.parse(text)
+
+
+def emit_xml(data):
+    from dicttoxml import dicttoxml
+    return dicttoxml(data, custom_root='root', attr_type=False).decode()
+
+
+# --- CSV ---
+def parse_csv(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def emit_csv(data):
+    rows = [data] if isinstance(data, dict) else data
+    if not (isinstance(rows, list) and rows and all(isinstance(row, dict) for row in rows)):
+        raise CodecError('CSV conversion supports list of objects/dicts.')
+    # Header is every key of every row, so rows with extra keys don't break the writer
+    return ''.join(csv_chunks(rows, union_fieldnames(rows)))
+
+
+# --- JSON Lines ---
+def parse_jsonl(text):
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def emit_jsonl(data):
+    rows = data if isinstance(data, list) else [data]
+    return ''.join(jsonl_chunks(rows))
+
+
+# --- TOML ---
+def parse_toml(text):
+    try:
+        import tomllib
+    except ImportError:
+        import toml as tomllib
+    return tomllib.loads(text)
+
+
+def emit_toml(data):
+    import toml
+    return toml.dumps(data)
+
+
+# --- INI ---
+def parse_ini(text):
+    cp = configparser.ConfigParser()
+    cp.read_string(text)
+    parsed = {s: dict(cp[s]) for s in cp.sections()}
+    if cp.defaults():
+        parsed['DEFAULT'] = dict(cp.defaults())
+    return parsed
+
+
+def emit_ini(data):
+    if not isinstance(data, dict):
+        raise CodecError('INI conversion requires a flat dict.')
+    cp = configparser.ConfigParser()
+    cp['DEFAULT'] = {k: str(v) for k, v in data.items()}
+    output = io.StringIO()
+    cp.write(output)
+    return output.getvalue()
+
+
+register('json', ('.json',), parse_json, emit_json)
+register('yaml', ('.yaml', '.yml'), parse_yaml, emit_yaml)
+register('xml', ('.xml',), parse_xml, emit_xml)
+register('csv', ('.csv',), parse_csv, emit_csv)
+register('jsonl', ('.jsonl', '.ndjson'), parse_jsonl, emit_jsonl)
+register('toml', ('.toml',), parse_toml, emit_toml)
+register('ini', ('.ini',), parse_ini, emit_ini)
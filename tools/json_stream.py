@@ -0,0 +1,224 @@
+import codecs
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]*')
+_WHOLE_STRING = re.compile(r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"')
+_SCALAR = re.compile(r'[^ \t\n\r,:\[\]{}"]+')
+_NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?\Z')
+_HEX4 = re.compile(r'[0-9a-fA-F]{4}\Z')
+_LITERALS = ('true', 'false', 'null')
+
+# What the reformatter expects next
+VALUE, VALUE_OR_CLOSE, KEY, KEY_OR_CLOSE, COLON, COMMA_OR_CLOSE, END = range(7)
+
+
+def _discard(text):
+    pass
+
+
+class JSONStreamError(ValueError):
+    def __init__(self, message, position):
+        super().__init__(f"{message} (char {position})")
+        self.position = position
+
+
+def read_text_chunks(stream, chunk_size=CHUNK_SIZE):
+    # UTF-8 text from a binary stream a chunk at a time, characters split across chunks are handled by the decoder
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        data = stream.read(chunk_size)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+
+# Re-indents (or minifies) JSON text fed to it in pieces. Only the container stack and at most one
+# unfinished token are kept around, so memory doesn't grow with the document.
+# Output matches json.dumps(indent=...) layout; strings and numbers are copied as written.
+class JSONReformatter:
+    def __init__(self, indent=4, emit=True):
+        self.indent = indent
+        self.emit = emit
+        self._stack = []
+        self._expect = VALUE
+        self._in_string = False
+        self._string_is_key = False
+        self._pending_open = False
+        self._carry = ''
+        self._fed = 0
+        self._out = []
+        self._write = self._out.append if emit else _discard
+        self._newlines = []
+
+    def _newline(self):
+        if self.indent is not None:
+            depth = len(self._stack)
+            while len(self._newlines) <= depth:
+                self._newlines.append('\n' + ' ' * (self.indent * len(self._newlines)))
+            self._write(self._newlines[depth])
+
+    def _start_item(self):
+        # First item after an opening bracket goes on its own line
+        if self._pending_open:
+            self._pending_open = False
+            self._newline()
+
+    def _value_done(self):
+        self._expect = COMMA_OR_CLOSE if self._stack else END
+
+    def _flush(self):
+        out = ''.join(self._out)
+        self._out.clear()
+        return out
+
+    def feed(self, text, final=False):
+        buf = self._carry + text
+        base = self._fed - len(self._carry)
+        self._fed += len(text)
+        self._carry = ''
+        i, n = 0, len(buf)
+
+        while i < n:
+            if self._in_string:
+                j = _STRING_RUN.match(buf, i).end()
+                if j > i:
+                    self._write(buf[i:j])
+                    i = j
+                if i >= n:
+                    break
+                c = buf[i]
+                if c == '"':
+                    self._write('"')
+                    self._in_string = False
+                    i += 1
+                    if self._string_is_key:
+                        self._expect = COLON
+                    else:
+                        self._value_done()
+                elif c == '\\':
+                    escape_len = 6 if buf[i + 1:i + 2] == 'u' else 2
+                    if i + escape_len > n:
+                        if final:
+                            raise JSONStreamError("Unterminated string", base + i)
+                        self._carry = buf[i:]
+                        break
+                    escape = buf[i:i + escape_len]
+                    if escape_len == 6 and not _HEX4.match(escape, 2):
+                        raise JSONStreamError("Invalid \\u escape", base + i)
+                    if escape_len == 2 and escape[1] not in '"\\/bfnrt':
+                        raise JSONStreamError("Invalid escape", base + i)
+                    self._write(escape)
+                    i += escape_len
+                else:
+                    raise JSONStreamError("Invalid control character in string", base + i)
+                continue
+
+            i = _WHITESPACE.match(buf, i).end()
+            if i >= n:
+                break
+            c = buf[i]
+            expect = self._expect
+
+            if c == '"':
+                if expect in (VALUE, VALUE_OR_CLOSE):
+                    self._string_is_key = False
+                elif expect in (KEY, KEY_OR_CLOSE):
+                    self._string_is_key = True
+                else:
+                    raise JSONStreamError("Unexpected string", base + i)
+                self._start_item()
+                whole = _WHOLE_STRING.match(buf, i)
+                if whole:
+                    # Common case, the whole string is in this chunk
+                    i = whole.end()
+                    self._write(buf[whole.start():i])
+                    if self._string_is_key:
+                        self._expect = COLON
+                    else:
+                        self._value_done()
+                else:
+                    self._write('"')
+                    self._in_string = True
+                    i += 1
+            elif c == '{' or c == '[':
+                if expect not in (VALUE, VALUE_OR_CLOSE):
+                    raise JSONStreamError(f"Unexpected '{c}'", base + i)
+                self._start_item()
+                self._write(c)
+                self._stack.append(c)
+                self._pending_open = True
+                self._expect = KEY_OR_CLOSE if c == '{' else VALUE_OR_CLOSE
+                i += 1
+            elif c == '}' or c == ']':
+                opener = '{' if c == '}' else '['
+                allowed = (KEY_OR_CLOSE, COMMA_OR_CLOSE) if c == '}' else (VALUE_OR_CLOSE, COMMA_OR_CLOSE)
+                if not self._stack or self._stack[-1] != opener or expect not in allowed:
+                    raise JSONStreamError(f"Unexpected '{c}'", base + i)
+                self._stack.pop()
+                if self._pending_open:
+                    # Empty container stays on one line: {} / []
+                    self._pending_open = False
+                else:
+                    self._newline()
+                self._write(c)
+                self._value_done()
+                i += 1
+            elif c == ',':
+                if expect != COMMA_OR_CLOSE:
+                    raise JSONStreamError("Unexpected ','", base + i)
+                self._write(',')
+                self._newline()
+                self._expect = KEY if self._stack[-1] == '{' else VALUE
+                i += 1
+            elif c == ':':
+                if expect != COLON:
+                    raise JSONStreamError("Unexpected ':'", base + i)
+                self._write(': ' if self.indent is not None else ':')
+                self._expect = VALUE
+                i += 1
+            else:
+                j = _SCALAR.match(buf, i).end()
+                if j == n and not final:
+                    # Number or literal might continue in the next chunk
+                    self._carry = buf[i:]
+                    break
+                token = buf[i:j]
+                if expect not in (VALUE, VALUE_OR_CLOSE) or not (token in _LITERALS or _NUMBER.match(token)):
+                    raise JSONStreamError(f"Unexpected '{token[:20]}'", base + i)
+                self._start_item()
+                self._write(token)
+                self._value_done()
+                i = j
+
+        return self._flush()
+
+    def close(self):
+        out = self.feed('', final=True) if self._carry else self._flush()
+        if self._in_string or self._stack or self._expect != END:
+            raise JSONStreamError("Unexpected end of JSON", self._fed)
+        return out
+
+
+def validate_stream(stream):
+    # Raises JSONStreamError / UnicodeDecodeError if the document is not valid JSON, keeps nothing
+    checker = JSONReformatter(indent=None, emit=False)
+    for text in read_text_chunks(stream):
+        checker.feed(text)
+    checker.close()
+
+
+def reformat_stream(stream, indent=4):
+    # Yields the re-indented (indent=None: minified) document piece by piece
+    formatter = JSONReformatter(indent=indent)
+    for text in read_text_chunks(stream):
+        out = formatter.feed(text)
+        if out:
+            yield out
+    out = formatter.close()
+    if out:
+        yield out
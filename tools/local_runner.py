@@ -0,0 +1,262 @@
+import atexit
+import json
+import os
+import platform
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from tools.code_runner import ExecutionError
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs Python snippets on this machine without going out to Piston.
+# Each pool slot is a warm worker process ("zygote") that has Python and the common modules loaded already.
+# For every snippet it forks a child, puts CPU / memory / output / process / open file rlimits on it and collects what it printed.
+# rlimits only cap resources, they don't isolate the filesystem or network, so run this inside a container.
+
+LANGUAGES = ('python', 'python3', 'py')
+POOL_SIZE = 2
+CPU_LIMIT = 2                     # seconds of CPU per snippet
+MEMORY_LIMIT = 256 * 1024 * 1024  # address space
+OUTPUT_LIMIT = 64 * 1024          # bytes per stream
+PROCESS_LIMIT = 0                 # no fork/exec/threads from a snippet (RLIMIT_NPROC doesn't apply to root)
+OPEN_FILES_LIMIT = 32
+WALL_TIMEOUT = 5.0                # for snippets that sleep or block on input
+ACQUIRE_TIMEOUT = 10.0
+
+# The zygote gets none of the web process's environment (secret keys, DB URLs, API keys), only enough to start Python
+ZYGOTE_ENV = {'PATH': '/usr/bin:/bin', 'LANG': 'C.UTF-8', 'PYTHONPATH': PROJECT_ROOT}
+
+# Loaded once in the zygote so snippets that use them start instantly
+PRELOAD = ('collections', 'datetime', 'functools', 'itertools', 'json', 'math', 'random', 're', 'string', 'traceback')
+
+SIGNAL_MESSAGES = {
+    'SIGXCPU': 'CPU time limit exceeded',
+    'SIGXFSZ': 'Output limit exceeded',
+    'SIGKILL': 'Timed out',
+}
+
+
+# --- Zygote side ---
+def run_snippet(code, stdin, workdir):
+    # Runs in the forked child, never returns
+    import resource
+    try:
+        os.setsid()
+        os.chdir(workdir)
+        with open('stdin', 'w') as f:
+            f.write(stdin)
+        for fd, name, mode in ((0, 'stdin', os.O_RDONLY), (1, 'stdout', os.O_WRONLY | os.O_CREAT), (2, 'stderr', os.O_WRONLY | os.O_CREAT)):
+            os.dup2(os.open(name, mode), fd)
+        # Nothing but stdin/stdout/stderr stays open, the zygote's job pipes included
+        os.closerange(3, 65536)
+
+        resource.setrlimit(resource.RLIMIT_CPU, (CPU_LIMIT, CPU_LIMIT + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT, MEMORY_LIMIT))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (OUTPUT_LIMIT, OUTPUT_LIMIT))
+        resource.setrlimit(resource.RLIMIT_NPROC, (PROCESS_LIMIT, PROCESS_LIMIT))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (OPEN_FILES_LIMIT, OPEN_FILES_LIMIT))
+        # Python ignores SIGXFSZ, put it back so going over the output cap kills the snippet
+        signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+
+        exit_code = 0
+        try:
+            exec(compile(code, 'main', 'exec'), {'__name__': '__main__'})
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException as e:
+            import traceback
+            # Leave this function's frame out, the traceback starts in the user's code
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            exit_code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        exit_code = 1
+    os._exit(exit_code)
+
+
+def read_capped(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(OUTPUT_LIMIT).decode('utf-8', errors='replace')
+    except OSError:
+        return ''
+
+
+def execute_snippet(code, stdin):
+    workdir = tempfile.mkdtemp(prefix='run-')
+    try:
+        started = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            run_snippet(code, stdin, workdir)
+
+        deadline = started + WALL_TIMEOUT
+        delay = 0.001
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+            if time.monotonic() > deadline:
+                os.killpg(pid, signal.SIGKILL)
+                done, status = os.waitpid(pid, 0)
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+        stdout = read_capped(os.path.join(workdir, 'stdout'))
+        stderr = read_capped(os.path.join(workdir, 'stderr'))
+        signal_name = None
+        if os.WIFSIGNALED(status):
+            signal_name = signal.Signals(os.WTERMSIG(status)).name
+            exit_code = None
+            stderr += ('\n' if stderr else '') + SIGNAL_MESSAGES.get(signal_name, f'Killed by {signal_name}')
+        else:
+            exit_code = os.WEXITSTATUS(status)
+
+        return {
+            'stdout': stdout,
+            'stderr': stderr,
+            'output': stdout + stderr,
+            'code': exit_code,
+            'signal': signal_name,
+            'wall_time': round((time.monotonic() - started) * 1000),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def zygote_main():
+    for name in PRELOAD:
+        __import__(name)
+    # The project is only on the path to start this module, snippets shouldn't be able to import config & co
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or '.') != PROJECT_ROOT]
+    os.environ.pop('PYTHONPATH', None)
+    # Jobs come in on stdin and results go out on stdout, one JSON object per line.
+    # The pipes are moved off fds 0/1 so forked snippets can't write into the protocol.
+    jobs = os.fdopen(os.dup(0), 'r')
+    results = os.fdopen(os.dup(1), 'w')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.set_inheritable(jobs.fileno(), False)
+    os.set_inheritable(results.fileno(), False)
+
+    for line in jobs:
+        job = json.loads(line)
+        try:
+            result = execute_snippet(job['code'], job['stdin'])
+        except Exception as e:
+            result = {'error': f"{type(e).__name__}: {str(e)}"}
+        results.write(json.dumps(result) + '\n')
+        results.flush()
+
+
+# --- Web process side ---
+class Zygote:
+    def __init__(self):
+        # Started in an empty directory of its own, not the project root
+        self.home = tempfile.mkdtemp(prefix='zygote-')
+        self.process = subprocess.Popen(
+            [sys.executable, '-s', '-m', 'tools.local_runner'],
+            cwd=self.home,
+            env=dict(ZYGOTE_ENV, HOME=self.home),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+
+    def execute(self, code, stdin):
+        self.process.stdin.write(json.dumps({'code': code, 'stdin': stdin}) + '\n')
+        self.process.stdin.flush()
+        # The zygote enforces WALL_TIMEOUT itself, this only guards against it hanging
+        ready, _, _ = select.select([self.process.stdout], [], [], WALL_TIMEOUT + 5)
+        line = self.process.stdout.readline() if ready else ''
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait(1)
+        self.process.stdin.close()
+        self.process.stdout.close()
+        shutil.rmtree(self.home, ignore_errors=True)
+
+
+# Backend with the same execute(payload) -> Piston response shape as PistonBackend.
+# Languages it can't run go to the fallback backend when there is one.
+class LocalBackend:
+    def __init__(self, size=POOL_SIZE, fallback=None):
+        self.size = size
+        self.fallback = fallback
+        self._idle = queue.Queue()
+        self._zygotes = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._add_zygote()
+            self._started = True
+            atexit.register(self.shutdown)
+
+    def _add_zygote(self):
+        zygote = Zygote()
+        self._zygotes.append(zygote)
+        self._idle.put(zygote)
+
+    def _replace(self, zygote):
+        zygote.kill()
+        with self._lock:
+            self._zygotes.remove(zygote)
+            self._add_zygote()
+
+    def execute(self, payload):
+        if payload["language"] not in LANGUAGES:
+            if self.fallback is not None:
+                return self.fallback.execute(payload)
+            raise ExecutionError(f"{payload['language']} is not supported by the local runner")
+
+        if not self._started:
+            self._start()
+        try:
+            zygote = self._idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise ExecutionError("Code runner is busy, try again in a moment")
+
+        try:
+            run = zygote.execute(payload["files"][0]["content"], payload.get("stdin", ""))
+        except (EOFError, OSError, ValueError):
+            self._replace(zygote)
+            raise ExecutionError("Local code runner crashed")
+        self._idle.put(zygote)
+
+        if 'error' in run:
+            raise ExecutionError(run['error'])
+        return {"language": "python", "version": platform.python_version(), "run": run}
+
+    def shutdown(self):
+        with self._lock:
+            for zygote in self._zygotes:
+                zygote.kill()
+            self._zygotes = []
+
+
+if __name__ == '__main__':
+    zygote_main()
@@ -0,0 +1,43 @@
+import argparse
+import platform
+
+from flask import Flask, jsonify, request
+
+from tools.code_runner import ExecutionError
+from tools.local_runner import LocalBackend, LANGUAGES
+
+# Small server with the same endpoints as the Piston API, backed by the local runner.
+# Point PISTON_URL at it to run the normal remote path without going to emkc.org:
+#   python -m tools.piston_standin --port 2000
+#   PISTON_URL=http://localhost:2000/api/v2/piston/execute python app.py
+
+app = Flask(__name__)
+backend = LocalBackend()
+
+
+@app.route("/api/v2/piston/runtimes")
+def runtimes():
+    return jsonify([{"language": "python", "version": platform.python_version(), "aliases": list(LANGUAGES[1:])}])
+
+
+@app.route("/api/v2/piston/execute", methods=["POST"])
+def execute():
+    payload = request.get_json(silent=True) or {}
+    if not payload.get("language") or not payload.get("files"):
+        return jsonify({"message": "language and files are required"}), 400
+    payload.setdefault("version", "*")
+    payload.setdefault("stdin", "")
+
+    try:
+        return jsonify(backend.execute(payload))
+    except ExecutionError as e:
+        # Piston answers unknown runtimes and failures with a 400 and a message
+        return jsonify({"message": str(e)}), 400
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Piston execute API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2000)
+    args = parser.parse_args()
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,272 @@
+import atexit
+import json
+import os
+import queue
+import re
+import select
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# How long one request may spend matching before its worker is killed
+MATCH_TIMEOUT = 2.0
+POOL_SIZE = 2
+# How long to wait for a free worker when all of them are busy
+ACQUIRE_TIMEOUT = 5.0
+MAX_MATCHES = 1000
+MAX_TEXT_SIZE = 1024 * 1024
+PATTERN_CACHE_SIZE = 256
+
+# Batch mode: lines go to a worker in groups this big, each group gets MATCH_TIMEOUT
+BATCH_LINES = 500
+BATCH_SIZE = 256 * 1024
+LINE_MAX_MATCHES = 100
+# Whole batch request stops after this many seconds of matching
+BATCH_TIME_BUDGET = 60.0
+
+FLAG_LETTERS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE, 'a': re.ASCII}
+# JS flags the regex page offers that mean nothing here: g (every match is returned anyway), u (Python is unicode by default)
+# and y (sticky only changes where the next exec() call starts, there are no repeated calls here)
+IGNORED_FLAGS = 'guy'
+
+
+class RegexError(ValueError):
+    pass
+
+
+class RegexTimeout(RegexError):
+    pass
+
+
+class RegexBusy(RegexError):
+    pass
+
+
+def parse_flags(letters):
+    flags = 0
+    for letter in letters or '':
+        if letter in IGNORED_FLAGS:
+            continue
+        if letter not in FLAG_LETTERS:
+            raise RegexError(f"Unsupported flag '{letter}'")
+        flags |= FLAG_LETTERS[letter]
+    return flags
+
+
+# --- Worker process side ---
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern, flags):
+    return re.compile(pattern, flags)
+
+
+def match_dict(m):
+    return {
+        'match': m.group(0),
+        'span': list(m.span()),
+        'groups': list(m.groups()),
+        'named': m.groupdict(),
+    }
+
+
+def collect_matches(regex, text, limit):
+    matches = []
+    for m in regex.finditer(text):
+        if len(matches) >= limit:
+            return matches, True
+        matches.append(match_dict(m))
+    return matches, False
+
+
+def find_matches(pattern, flags, text, limit=MAX_MATCHES):
+    started = time.perf_counter()
+    try:
+        regex = compile_pattern(pattern, flags)
+    except re.error as e:
+        return {'error': f"Invalid regex: {str(e)}"}
+    compiled = time.perf_counter()
+
+    matches, truncated = collect_matches(regex, text, limit)
+
+    return {
+        'matches': matches,
+        'count': len(matches),
+        'truncated': truncated,
+        'compile_ms': round((compiled - started) * 1000, 3),
+        'match_ms': round((time.perf_counter() - compiled) * 1000, 3),
+    }
+
+
+def match_lines(pattern, flags, lines, first_line, limit=LINE_MAX_MATCHES):
+    try:
+        regex = compile_pattern(pattern, flags)
+    except re.error as e:
+        return {'error': f"Invalid regex: {str(e)}"}
+
+    results = []
+    for line_no, text in enumerate(lines, first_line):
+        matches, truncated = collect_matches(regex, text, limit)
+        result = {'line': line_no, 'count': len(matches)}
+        if matches:
+            result['matches'] = matches
+        if truncated:
+            result['truncated'] = True
+        results.append(result)
+    return {'results': results}
+
+
+JOBS = {'find': find_matches, 'lines': match_lines}
+
+
+def worker_main(stdin, stdout):
+    # One JSON job per line in, one JSON result per line out
+    for line in stdin:
+        job, args = json.loads(line)
+        try:
+            result = JOBS[job](*args)
+        except Exception as e:
+            result = {'error': f"{type(e).__name__}: {str(e)}"}
+        stdout.write(json.dumps(result) + '\n')
+        stdout.flush()
+
+
+# --- Web process side ---
+class RegexWorker:
+    # A plain `python -m` child so it starts clean instead of re-running the app's startup code
+    def __init__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'tools.regex_engine'],
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+
+    def send(self, job, args):
+        self.process.stdin.write(json.dumps([job, args]) + '\n')
+        self.process.stdin.flush()
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        return bool(ready)
+
+    def recv(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait(1)
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+
+# Pool of long lived worker processes. A match that runs past the timeout can't be interrupted
+# inside the re module, so the worker running it is killed and replaced with a fresh one.
+class RegexEngine:
+    def __init__(self, size=POOL_SIZE, timeout=MATCH_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start(self):
+        # Workers are started on first use so importing the app doesn't spawn processes
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._add_worker()
+            self._started = True
+            atexit.register(self.shutdown)
+
+    def _add_worker(self):
+        worker = RegexWorker()
+        self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker):
+        # The slot gets a new worker even if killing the old one goes wrong
+        try:
+            worker.kill()
+        finally:
+            with self._lock:
+                self._workers.remove(worker)
+                self._add_worker()
+
+    def run(self, job, *args, timeout=None):
+        if not self._started:
+            self._start()
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            worker = self._idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise RegexBusy("Regex tester is busy, try again in a moment")
+
+        try:
+            worker.send(job, args)
+            finished = worker.wait(timeout)
+            result = worker.recv() if finished else None
+        except (EOFError, OSError, ValueError):
+            # Worker died (out of memory etc.)
+            self._replace(worker)
+            raise RegexError("Regex worker crashed while matching")
+        if not finished:
+            self._replace(worker)
+            raise RegexTimeout(f"Pattern took longer than {timeout:g}s and was stopped")
+        self._idle.put(worker)
+
+        if 'error' in result:
+            raise RegexError(result['error'])
+        return result
+
+    def find(self, pattern, text, flags=0, limit=MAX_MATCHES, timeout=None):
+        if len(text) > MAX_TEXT_SIZE:
+            raise RegexError("Test string is too long (max 1MB)")
+        started = time.perf_counter()
+        result = self.run('find', pattern, flags, text, limit, timeout=timeout)
+        result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def iter_lines(self, pattern, lines, flags=0):
+        # Runs the pattern over each line, yields one result per line as the batches come back.
+        # Workers are only held for one batch at a time so a big file doesn't block other users.
+        budget_ends = time.monotonic() + BATCH_TIME_BUDGET
+        batch, size, first_line = [], 0, 1
+        for line in lines:
+            batch.append(line)
+            size += len(line)
+            if len(batch) >= BATCH_LINES or size >= BATCH_SIZE:
+                yield from self._run_batch(pattern, flags, batch, first_line, budget_ends)
+                first_line += len(batch)
+                batch, size = [], 0
+        if batch:
+            yield from self._run_batch(pattern, flags, batch, first_line, budget_ends)
+
+    def _run_batch(self, pattern, flags, batch, first_line, budget_ends):
+        remaining = budget_ends - time.monotonic()
+        if remaining <= 0:
+            raise RegexTimeout(f"Batch stopped after {BATCH_TIME_BUDGET:g}s at line {first_line}")
+        result = self.run('lines', pattern, flags, batch, first_line, timeout=min(self.timeout, remaining))
+        return result['results']
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.kill()
+            self._workers = []
+
+
+regex_engine = RegexEngine()
+
+
+if __name__ == '__main__':
+    worker_main(sys.stdin, sys.stdout)
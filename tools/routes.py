@@ -1,26 +1,76 @@
-from flask import Blueprint, render_template, request, jsonify, send_file, session, redirect, url_for
-import json
-import io
-import yaml
+from flask import Blueprint, render_template, request, jsonify, send_file, session, redirect, url_for, Response, stream_with_context
 import csv
-import toml
-import configparser
-import xmltodict
-import re
-import requests
-from flask import Flask, request, jsonify
-from dicttoxml import dicttoxml
+import io
+import json
+import time
 from extensions import db
 from models import *
+from users import get_current_user
+from points import spend_points
+from tools.json_stream import validate_stream, reformat_stream, JSONStreamError
+from tools.formats import get_codec, codec_for_filename, parse_json, emit_json, CodecError
+from tools.csv_stream import stream_conversion, StreamConversionError, STREAMABLE_PAIRS
+from tools.regex_engine import regex_engine, parse_flags, RegexError
+from tools.code_runner import code_runner, RunnerBusy
 
 json_bp = Blueprint('json_formatter', __name__)
 
+# Uploads up to this size are handled in memory, bigger JSON files are formatted/minified as a streamed download
+MAX_INLINE_SIZE = 5 * 1024 * 1024
+
+
+def stream_json_file(file, action, current_user):
+    # First pass only validates so errors can still come back as JSON, second pass streams the output.
+    # Werkzeug keeps big uploads in a temp file, so neither pass holds the document in memory
+    try:
+        validate_stream(file.stream)
+    except JSONStreamError as e:
+        return jsonify({'status': 'error', 'message': f'Invalid JSON: {str(e)}'})
+    except UnicodeDecodeError:
+        return jsonify({'status': 'error', 'message': 'File encoding error. Please use UTF-8 encoding.'})
+
+    if action == 'download':
+        if not spend_points(current_user, 2, 'json_download'):
+            return jsonify({'status': 'error', 'message': 'Not enough points to download.'})
+        db.session.commit()
+
+    file.stream.seek(0)
+    indent = None if action == 'minify' else 4
+    download_name = 'minified.json' if action == 'minify' else 'formatted.json'
+    return Response(
+        stream_with_context(reformat_stream(file.stream, indent=indent)),
+        mimetype='application/json',
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
+    )
+
+
+def stream_converted_file(file, convert_from, convert_to, action, current_user):
+    # stream_conversion does its first pass (header / validation) before returning, so errors still come back as JSON
+    try:
+        chunks = stream_conversion(file.stream, convert_from, convert_to)
+    except (StreamConversionError, csv.Error) as e:
+        return jsonify({'status': 'error', 'message': f'Error converting {convert_from} to {convert_to}: {str(e)}'})
+    except UnicodeDecodeError:
+        return jsonify({'status': 'error', 'message': 'File encoding error. Please use UTF-8 encoding.'})
+
+    if action == 'download_converted':
+        if not spend_points(current_user, 3, 'converted_download'):
+            return jsonify({'status': 'error', 'message': 'Not enough points to download converted file.'})
+        db.session.commit()
+
+    ext = get_codec(convert_to).extensions[0]
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/plain',
+        headers={'Content-Disposition': f'attachment; filename=converted{ext}'}
+    )
+
 @json_bp.route('/json_formatter', methods=['GET', 'POST'])
 def json_formatter():
     if 'username' not in session:
         return redirect(url_for('home'))
 
-    current_user = User.query.filter_by(username=session['username']).first()
+    current_user = get_current_user()
 
     if request.method == 'POST':
         action = request.form.get('action')
@@ -39,141 +89,83 @@ def json_formatter():
             file.seek(0, 2)
             file_size = file.tell()
             file.seek(0)
-            
-            if file_size > 5 * 1024 * 1024:  # 5MB
-                return jsonify({'status': 'error', 'message': 'File too large. Maximum size is 5MB.'})
+
+            if not convert_from:
+                codec = codec_for_filename(file.filename)
+                if codec:
+                    convert_from = codec.name
+
+            big_or_streamed = file_size > MAX_INLINE_SIZE or request.form.get('stream')
+            if action in ('format', 'minify', 'download') and big_or_streamed:
+                return stream_json_file(file, action, current_user)
+
+            # CSV / JSON / JSON Lines convert row by row, downloads of those always stream
+            if action in ('convert', 'download_converted') and (convert_from, convert_to) in STREAMABLE_PAIRS \
+                    and (big_or_streamed or action == 'download_converted'):
+                return stream_converted_file(file, convert_from, convert_to, action, current_user)
+
+            if file_size > MAX_INLINE_SIZE:  # 5MB
+                return jsonify({'status': 'error', 'message': 'File too large. Maximum size for conversion is 5MB.'})
             
             try:
                 raw_input = file.read().decode('utf-8')
             except UnicodeDecodeError:
                 return jsonify({'status': 'error', 'message': 'File encoding error. Please use UTF-8 encoding.'})
-            
-            if not convert_from:
-                filename = file.filename.lower()
-                if filename.endswith('.json'):
-                    convert_from = 'json'
-                elif filename.endswith(('.yaml', '.yml')):
-                    convert_from = 'yaml'
-                elif filename.endswith('.csv'):
-                    convert_from = 'csv'
-                elif filename.endswith('.toml'):
-                    convert_from = 'toml'
-                elif filename.endswith('.ini'):
-                    convert_from = 'ini'
-                elif filename.endswith('.xml'):
-                    convert_from = 'xml'
         else:
             raw_input = request.form.get('raw_json', '').strip()
 
         try:
             if action in ('format', 'minify', 'download'):
                 try:
-                    parsed = json.loads(raw_input)
+                    parsed = parse_json(raw_input)
                 except Exception as e:
                     return jsonify({'status': 'error', 'message': f'Invalid JSON: {str(e)}'})
 
                 if action == 'format':
-                    pretty = json.dumps(parsed, indent=4)
+                    pretty = emit_json(parsed, indent=4)
                     return jsonify({'status': 'success', 'formatted': pretty})
 
                 if action == 'minify':
-                    minified = json.dumps(parsed, separators=(',', ':'))
+                    minified = emit_json(parsed, indent=None)
                     return jsonify({'status': 'success', 'formatted': minified})
 
                 if action == 'download':
-                    if current_user.points < 2:
+                    if not spend_points(current_user, 2, 'json_download'):
                         return jsonify({'status': 'error', 'message': 'Not enough points to download.'})
-                    formatted = json.dumps(parsed, indent=4)
-                    file_obj = io.BytesIO(formatted.encode())
-                    current_user.points -= 2
                     db.session.commit()
+                    formatted = emit_json(parsed, indent=4)
+                    file_obj = io.BytesIO(formatted.encode())
                     return send_file(file_obj, download_name='formatted.json', as_attachment=True, mimetype='application/json')
 
-                if action == 'download_converted':
-                    if current_user.points < 3:
-                        return jsonify({'status': 'error', 'message': 'Not enough points to download converted file.'})
-                    
-                    return jsonify({'status': 'error', 'message': 'Please use Convert first, then Download Converted.'})
+            elif action in ('convert', 'download_converted'):
+                # Readers and writers for every format live in tools/formats.py
+                source = get_codec(convert_from or 'json')
+                target = get_codec(convert_to or 'json')
+                if source is None:
+                    return jsonify({'status': 'error', 'message': f'Unsupported input format: {convert_from}'})
+                if target is None:
+                    return jsonify({'status': 'error', 'message': f'Unsupported output format: {convert_to}'})
 
-            elif action == 'convert':
                 try:
-                    if convert_from == 'json' or not convert_from:
-                        parsed = json.loads(raw_input)
-                    elif convert_from == 'yaml':
-                        parsed = yaml.safe_load(raw_input)
-                    elif convert_from == 'xml':
-                        parsed = xmltodict.parse(raw_input)
-                    elif convert_from == 'csv':
-                        f = io.StringIO(raw_input)
-                        reader = csv.DictReader(f)
-                        parsed = list(reader)
-                    elif convert_from == 'toml':
-                        parsed = toml.loads(raw_input)
-                    elif convert_from == 'ini':
-                        cp = configparser.ConfigParser()
-                        cp.read_string(raw_input)
-                        parsed = {s: dict(cp[s]) for s in cp.sections()}
-                        if cp.defaults():
-                            parsed['DEFAULT'] = dict(cp.defaults())
-                    else:
-                        return jsonify({'status': 'error', 'message': f'Unsupported input format: {convert_from}'})
+                    parsed = source.parse(raw_input)
                 except Exception as e:
                     return jsonify({'status': 'error', 'message': f'Error parsing {convert_from}: {str(e)}'})
 
                 try:
-                    if convert_to == 'json' or not convert_to:
-                        converted = json.dumps(parsed, indent=4)
-                    elif convert_to == 'yaml':
-                        converted = yaml.dump(parsed, sort_keys=False)
-                    elif convert_to == 'xml':
-                        xml_bytes = dicttoxml(parsed, custom_root='root', attr_type=False)
-                        converted = xml_bytes.decode()
-                    elif convert_to == 'csv':
-                        if isinstance(parsed, dict):
-                            parsed_list = [parsed]
-                        else:
-                            parsed_list = parsed
-                        if isinstance(parsed_list, list) and parsed_list and isinstance(parsed_list[0], dict):
-                            output = io.StringIO()
-                            writer = csv.DictWriter(output, fieldnames=parsed_list[0].keys())
-                            writer.writeheader()
-                            writer.writerows(parsed_list)
-                            converted = output.getvalue()
-                        else:
-                            return jsonify({'status': 'error', 'message': 'CSV conversion supports list of objects/dicts.'})
-                    elif convert_to == 'toml':
-                        converted = toml.dumps(parsed)
-                    elif convert_to == 'ini':
-                        if isinstance(parsed, dict):
-                            cp = configparser.ConfigParser()
-                            cp['DEFAULT'] = {k: str(v) for k, v in parsed.items()}
-                            output = io.StringIO()
-                            cp.write(output)
-                            converted = output.getvalue()
-                        else:
-                            return jsonify({'status': 'error', 'message': 'INI conversion requires a flat dict.'})
-                    else:
-                        return jsonify({'status': 'error', 'message': f'Unsupported output format: {convert_to}'})
+                    converted = target.emit(parsed)
+                except CodecError as e:
+                    return jsonify({'status': 'error', 'message': str(e)})
                 except Exception as e:
                     return jsonify({'status': 'error', 'message': f'Error converting to {convert_to}: {str(e)}'})
 
                 if action == 'download_converted':
-                    if current_user.points < 3:
+                    if not spend_points(current_user, 3, 'converted_download'):
                         return jsonify({'status': 'error', 'message': 'Not enough points to download converted file.'})
+                    db.session.commit()
                     
-                    file_extensions = {
-                        'json': '.json',
-                        'yaml': '.yaml',
-                        'xml': '.xml',
-                        'csv': '.csv',
-                        'toml': '.toml',
-                        'ini': '.ini'
-                    }
-                    ext = file_extensions.get(convert_to, '.txt')
+                    ext = target.extensions[0]
                     
                     file_obj = io.BytesIO(converted.encode())
-                    current_user.points -= 3
-                    db.session.commit()
                     
                     return send_file(file_obj, download_name=f'converted{ext}', as_attachment=True, mimetype='text/plain')
                 
@@ -197,22 +189,98 @@ def regex():
         pattern = request.form.get("pattern", "")
         test_string = request.form.get("test_string", "")
 
+        # Matching runs in the regex worker pool so a runaway pattern can't tie up this worker
         try:
-            regex = re.compile(pattern)
-            matches = regex.findall(test_string)
-            return jsonify({
-                "status": "success",
-                "matches": matches
-            })
-        except re.error as e:
+            result = regex_engine.find(pattern, test_string, flags=parse_flags(request.form.get("flags", "")))
+        except RegexError as e:
             return jsonify({
                 "status": "error",
-                "message": f"Invalid regex: {str(e)}"
+                "message": str(e)
             })
 
+        return jsonify({
+            "status": "success",
+            "matches": result["matches"],
+            "count": result["count"],
+            "truncated": result["truncated"],
+            "timing": {
+                "compile_ms": result["compile_ms"],
+                "match_ms": result["match_ms"],
+                "total_ms": result["elapsed_ms"]
+            }
+        })
+
     return render_template("tools/regex.html")
 
 
+def iter_upload_lines(file):
+    # Upload read line by line, never held in memory as a whole
+    text = io.TextIOWrapper(file.stream, encoding='utf-8', errors='replace', newline='')
+    try:
+        for line in text:
+            yield line.rstrip('\r\n')
+    finally:
+        text.detach()
+
+
+def regex_batch_results(pattern, flags, lines):
+    started = time.perf_counter()
+    line_count = matched_lines = total_matches = 0
+    error = None
+    try:
+        for result in regex_engine.iter_lines(pattern, lines, flags=flags):
+            line_count += 1
+            if result['count']:
+                matched_lines += 1
+                total_matches += result['count']
+            yield json.dumps(result) + '\n'
+    except RegexError as e:
+        error = str(e)
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'summary': True,
+        'lines': line_count,
+        'matched_lines': matched_lines,
+        'total_matches': total_matches,
+        'elapsed_ms': round(elapsed * 1000, 3),
+        'lines_per_sec': round(line_count / elapsed) if elapsed else line_count
+    }
+    if error:
+        summary['error'] = error
+    yield json.dumps(summary) + '\n'
+
+
+@json_bp.route("/regex/batch", methods=["POST"])
+def regex_batch():
+    if 'username' not in session:
+        return redirect(url_for('home'))
+
+    # Strings come as a JSON body {"pattern", "flags", "strings": [...]}, a form textarea (one per line) or an uploaded file
+    data = request.get_json(silent=True) or request.form
+    pattern = data.get("pattern", "")
+
+    if 'file' in request.files and request.files['file'].filename:
+        lines = iter_upload_lines(request.files['file'])
+    elif isinstance(data.get("strings"), list):
+        lines = [str(s) for s in data["strings"]]
+    else:
+        lines = data.get("test_strings", "").splitlines()
+
+    # Bad pattern or flags come back as a normal JSON error before anything is streamed
+    try:
+        flags = parse_flags(data.get("flags", ""))
+        regex_engine.find(pattern, "", flags=flags)
+    except RegexError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        })
+
+    # One JSON object per line (NDJSON), the last one is the summary
+    return Response(stream_with_context(regex_batch_results(pattern, flags, lines)), mimetype='application/x-ndjson')
+
+
 @json_bp.route("/run_code", methods=["GET", "POST"])
 def run_code():
     if 'username' not in session:
@@ -220,22 +288,34 @@ def run_code():
 
     if request.method == "POST":
         data = request.get_json()
-        language = data.get("language")
-        code = data.get("code")
-
-        payload = {
-            "language": language,
-            "version": "*",
-            "files": [{"name": "main", "content": code}]
-        }
+        current_user = get_current_user()
 
-        response = requests.post("https://emkc.org/api/v2/piston/execute", json=payload)
-        result = response.json()
+        try:
+            job_args = (current_user.id, data.get("language"), data.get("code", ""), data.get("stdin", ""))
+            # async (opt in for API clients): answer right away with a job id to poll at /run_code/jobs/<id>.
+            # Jobs only live in the process that took them, so this needs one long running process (not serverless).
+            # The page itself waits for the result in this request
+            if data.get("async"):
+                job = code_runner.submit(*job_args, use_cache=not data.get("fresh"))
+                return jsonify(job.to_dict()), 202
+            job = code_runner.run(*job_args, use_cache=not data.get("fresh"))
+        except RunnerBusy as e:
+            return jsonify({"status": "error", "output": "", "error": str(e)}), 429
 
-        return jsonify({
-            "output": result.get("run", {}).get("stdout", ""),
-            "error": result.get("run", {}).get("stderr", "")
-        })
+        if not job.done.is_set():
+            return jsonify({"status": "error", "output": "", "error": "Code is still waiting to run, try again in a moment."})
+        return jsonify(job.to_dict())
 
     return render_template("tools/run_code.html")
 
+
+@json_bp.route("/run_code/jobs/<job_id>")
+def run_code_job(job_id):
+    if 'username' not in session:
+        return redirect(url_for('home'))
+
+    job = code_runner.get(job_id)
+    if job is None or job.user_id != get_current_user().id:
+        return jsonify({"status": "error", "error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
@@ -0,0 +1,148 @@
+from collections import deque
+import hashlib
+import json
+import threading
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from http_client import upstream
+from models import TriviaQuestion
+
+TRIVIA_API_URL = "https://opentdb.com/api.php"
+REFILL_AMOUNT = 50
+# Start a background refill once fewer than this many questions are left
+LOW_WATER = 20
+FETCH_TIMEOUT = (3, 10)
+# Questions a process takes out of the table at once
+CLAIM_BATCH = 10
+
+CLAIM_COLUMNS = (TriviaQuestion.id, TriviaQuestion.question, TriviaQuestion.correct_answer,
+                 TriviaQuestion.incorrect_answers, TriviaQuestion.category)
+
+
+def question_hash(question):
+    return hashlib.sha1(question.encode('utf-8')).hexdigest()
+
+
+def question_dict(row):
+    # Same shape as TriviaQuestion.to_dict()
+    return {
+        "id": row.id,
+        "question": row.question,
+        "correct_answer": row.correct_answer,
+        "incorrect_answers": json.loads(row.incorrect_answers),
+        "category": row.category,
+    }
+
+
+# Buffer of opentdb questions in the trivia_question table, shared by every worker process.
+# Questions are claimed with DELETE ... RETURNING a few at a time, so each stored question goes to exactly
+# one process (and is served once) however many workers there are. Refills (50 at a time) run on a background thread.
+class QuestionPool:
+    def __init__(self):
+        self._queue = deque()  # questions this process has claimed and not served yet
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def __len__(self):
+        return len(self._queue)
+
+    def _claim(self):
+        # The subquery picks the oldest rows (skipping rows another worker has locked on Postgres), the DELETE
+        # only returns rows this statement removed, so two workers never get the same one
+        oldest = (select(TriviaQuestion.id).order_by(TriviaQuestion.id)
+                  .limit(CLAIM_BATCH).with_for_update(skip_locked=True))
+        if db.session.get_bind().dialect.delete_returning:
+            rows = db.session.execute(
+                delete(TriviaQuestion).where(TriviaQuestion.id.in_(oldest)).returning(*CLAIM_COLUMNS),
+                execution_options={'synchronize_session': False}
+            ).all()
+        else:
+            # No RETURNING here, read the rows and keep the ones whose DELETE actually removed them
+            rows = []
+            for row in db.session.execute(select(*CLAIM_COLUMNS).where(TriviaQuestion.id.in_(oldest))).all():
+                result = db.session.execute(delete(TriviaQuestion).where(TriviaQuestion.id == row.id),
+                                            execution_options={'synchronize_session': False})
+                if result.rowcount:
+                    rows.append(row)
+        db.session.commit()
+        return [question_dict(row) for row in sorted(rows, key=lambda row: row.id)]
+
+    def get(self):
+        with self._lock:
+            question = self._queue.popleft() if self._queue else None
+        if question is not None:
+            return question
+
+        claimed = self._claim()
+        if len(claimed) < CLAIM_BATCH or self.stored_count() < LOW_WATER:
+            self.refill_async()
+        if not claimed:
+            return None
+        with self._lock:
+            self._queue.extend(claimed[1:])
+        return claimed[0]
+
+    def stored_count(self):
+        return db.session.query(func.count(TriviaQuestion.id)).scalar()
+
+    def refill_async(self):
+        if self._refill_lock.locked():
+            return
+        threading.Thread(target=self._refill_in_context, name='trivia-refill', daemon=True).start()
+
+    def _refill_in_context(self):
+        with self._app.app_context():
+            try:
+                self.refill()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Trivia refill failed: {e}")
+
+    def refill(self):
+        # Only one refill at a time in this process, a second caller just waits for the running one to finish
+        with self._refill_lock:
+            if self.stored_count() >= LOW_WATER:
+                return 0
+
+            response = upstream.get(TRIVIA_API_URL, params={"amount": REFILL_AMOUNT, "type": "multiple"}, timeout=FETCH_TIMEOUT)
+            data = response.json()
+            if data.get("response_code") != 0:
+                print(f"Trivia API returned response code {data.get('response_code')}")
+                return 0
+
+            fresh = {}
+            for q in data.get("results", []):
+                fresh.setdefault(question_hash(q["question"]), q)
+            if not fresh:
+                return 0
+
+            # Some may be stored already, by an earlier refill or another process
+            stored = {h for (h,) in db.session.query(TriviaQuestion.question_hash).filter(TriviaQuestion.question_hash.in_(fresh))}
+            rows = [TriviaQuestion(
+                question=q["question"],
+                correct_answer=q["correct_answer"],
+                incorrect_answers=json.dumps(q["incorrect_answers"]),
+                category=q.get("category"),
+                difficulty=q.get("difficulty"),
+                question_hash=h
+            ) for h, q in fresh.items() if h not in stored]
+            if not rows:
+                return 0
+            db.session.add_all(rows)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another process stored some of the same questions at the same moment, its refill is enough
+                db.session.rollback()
+                return 0
+            return len(rows)
+
+
+question_pool = QuestionPool()
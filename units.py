@@ -0,0 +1,101 @@
+from functools import lru_cache
+import threading
+
+# Building Pint's registry takes a few hundred ms, so it happens on the first conversion instead of at import
+_ureg = None
+_ureg_lock = threading.Lock()
+
+
+def get_registry():
+    global _ureg
+    if _ureg is None:
+        with _ureg_lock:
+            if _ureg is None:
+                from pint import UnitRegistry
+                _ureg = UnitRegistry()
+    return _ureg
+
+# Pint dimensionality each converter accepts
+CONVERTER_DIMENSIONS = {
+    "distance": "[length]",
+    "temperature": "[temperature]",
+    "weight": "[mass]",
+    "volume": "[length] ** 3",
+    "time": "[time]",
+    "speed": "[length] / [time]",
+    "area": "[length] ** 2",
+    "pressure": "[mass] / [length] / [time] ** 2",
+    "energy": "[mass] * [length] ** 2 / [time] ** 2",
+    "power": "[mass] * [length] ** 2 / [time] ** 3",
+}
+
+# Spellings people (and API Ninjas) use that Pint doesn't know, keys are lowercase with spaces
+UNIT_ALIASES = {
+    "c": "degC", "°c": "degC", "celcius": "degC", "degrees celsius": "degC",
+    "f": "degF", "°f": "degF", "farenheit": "degF", "degrees fahrenheit": "degF",
+    "k": "kelvin",
+    "kph": "km/h", "kmh": "km/h", "kmph": "km/h", "kilometers per hour": "km/h",
+    "mps": "m/s", "meters per second": "m/s", "fps": "ft/s",
+    "kwh": "kWh", "kilowatt hour": "kWh", "wh": "Wh",
+    "btu": "Btu", "kcal": "kilocalorie", "cal": "calorie",
+    "mmhg": "mmHg", "inhg": "inHg", "torr": "torr",
+    "sq ft": "ft ** 2", "sqft": "ft ** 2", "sq m": "m ** 2", "sqm": "m ** 2", "sq km": "km ** 2", "sq mi": "mi ** 2",
+    "us gallon": "gallon", "imperial gallon": "imperial_gallon", "fl oz": "fluid_ounce", "floz": "fluid_ounce", "cc": "cm ** 3",
+    "lbs": "pound", "lb": "pound", "tonne": "metric_ton", "tonnes": "metric_ton",
+    "hr": "hour", "hrs": "hour", "mins": "minute", "secs": "second",
+    "hp": "horsepower",
+}
+
+
+class ConversionError(ValueError):
+    pass
+
+
+class UnknownUnitError(ConversionError):
+    pass
+
+
+@lru_cache(maxsize=1024)
+def parse_unit(name, converter_type):
+    # Try the name as typed first (Pint is case sensitive: mW vs MW), then looser spellings.
+    # The first one with the converter's dimension wins, so "F" is Fahrenheit for temperature and not farad
+    dimension = CONVERTER_DIMENSIONS.get(converter_type)
+    if dimension is None:
+        raise ConversionError(f"Unknown converter '{converter_type}'")
+    ureg = get_registry()
+    from pint.errors import PintError
+    expected = ureg.get_dimensionality(dimension)
+
+    stripped = name.strip()
+    spaced = stripped.replace("_", " ")
+    found = False
+    for candidate in (stripped, spaced, UNIT_ALIASES.get(spaced.lower()), spaced.lower()):
+        if not candidate:
+            continue
+        try:
+            unit = ureg.parse_units(candidate)
+        except (PintError, AttributeError, TypeError, ValueError, SyntaxError):
+            continue
+        if unit.dimensionality == expected:
+            return unit
+        found = True
+    if found:
+        raise ConversionError(f"'{name}' is not a {converter_type} unit")
+    raise UnknownUnitError(f"Unknown unit '{name}'")
+
+
+@lru_cache(maxsize=4096)
+def conversion_factors(converter_type, from_unit, to_unit):
+    # Every Pint conversion is affine (y = scale * x + offset), temperatures are the only ones with an offset.
+    # Working that out once per unit pair means a conversion is one multiply and one add afterwards
+    source = parse_unit(from_unit, converter_type)
+    target = parse_unit(to_unit, converter_type)
+    ureg = get_registry()
+    offset = ureg.Quantity(0, source).to(target).magnitude
+    scale = ureg.Quantity(1, source).to(target).magnitude - offset
+    return scale, offset
+
+
+def convert_units(converter_type, amount, from_unit, to_unit):
+    scale, offset = conversion_factors(converter_type, from_unit, to_unit)
+    return amount * scale + offset
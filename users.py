@@ -0,0 +1,47 @@
+from flask import g, session
+
+from entitlements import feature_keys
+from models import User
+
+
+def login_user(user):
+    # user_id is what the request loader uses, username stays for the templates and login checks
+    session['user_id'] = user.id
+    session['username'] = user.username
+
+
+def logout_user():
+    session.pop('user_id', None)
+    session.pop('username', None)
+    g.pop('current_user', None)
+
+
+def _load_current_user():
+    # One query for the user row, owned features come with it as feature_mask
+    query = User.query
+    user_id = session.get('user_id')
+    if user_id is not None:
+        return query.filter(User.id == user_id).first()
+
+    # Sessions from before user_id was stored only have the username, upgrade them on the way
+    username = session.get('username')
+    if username is None:
+        return None
+    user = query.filter(User.username == username).first()
+    if user:
+        session['user_id'] = user.id
+    return user
+
+
+def get_current_user():
+    # Loaded once per request and reused by every helper and template after that
+    if 'current_user' not in g:
+        g.current_user = _load_current_user()
+    return g.current_user
+
+
+def current_feature_keys():
+    user = get_current_user()
+    if user is None:
+        return set()
+    return feature_keys(user)